@@ -0,0 +1,90 @@
+"""
+Benchmark serial vs parallel text extraction in utils/pdf_processor.py
+
+Generates judgment-like PDFs of several hundred pages (or uses the PDFs given with
+--pdf), extracts each one serially and with the process pool, checks that both
+produce the same text and reports the best time of each.
+
+Run from LegalMitra:
+
+    python -m benchmarks.pdf_extraction --pages 100 300 600 --workers 4
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from typing import List, Optional
+
+import fitz  # PyMuPDF
+
+from utils.pdf_processor import extract_text_from_pdf
+
+WORDS = (
+    "the appellant respondent court held that section act provisions evidence witness tribunal "
+    "learned counsel submitted judgment order appeal petition high supreme constitution article "
+    "contract agreement property possession tenancy landlord notice compensation liability accused "
+    "prosecution conviction sentence bail trial magistrate jurisdiction statute interpretation"
+).split()
+
+def generate_pdf(path: str, pages: int, words_per_page: int = 550, seed: int = 0) -> None:
+    """Write a PDF of numbered, judgment-like paragraphs with some hyphenated line breaks"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    paragraph = 1
+    for _ in range(pages):
+        page = doc.new_page()
+        lines = []
+        remaining = words_per_page
+        while remaining > 0:
+            count = min(remaining, rng.randint(60, 140))
+            words = [rng.choice(WORDS) for _ in range(count)]
+            words[rng.randrange(count)] = "consider-\nation"
+            lines.append(f"{paragraph}. " + " ".join(words))
+            paragraph += 1
+            remaining -= count
+        page.insert_textbox(fitz.Rect(36, 36, 576, 806), "\n".join(lines), fontsize=6)
+    doc.save(path)
+    doc.close()
+
+def best_time(pdf_path: str, parallel: bool, workers: Optional[int], repeat: int) -> tuple:
+    times = []
+    text = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = extract_text_from_pdf(pdf_path, parallel=parallel, workers=workers)
+        times.append(time.perf_counter() - start)
+    return min(times), text
+
+def run(paths: List[str], workers: Optional[int], repeat: int) -> None:
+    print(f"cpus={os.cpu_count()} workers={workers or os.cpu_count()} repeat={repeat}")
+    for path in paths:
+        with fitz.open(path) as doc:
+            pages = doc.page_count
+        serial, serial_text = best_time(path, False, workers, repeat)
+        parallel, parallel_text = best_time(path, True, workers, repeat)
+        auto, _ = best_time(path, None, workers, repeat)
+        same = "identical" if serial_text == parallel_text else "DIFFERENT"
+        print(
+            f"{os.path.basename(path):<24} pages={pages:<5} serial={serial * 1000:8.1f}ms "
+            f"parallel={parallel * 1000:8.1f}ms speedup={serial / parallel:5.2f}x auto={auto * 1000:8.1f}ms output {same}"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark serial vs parallel PDF text extraction")
+    parser.add_argument("--pages", type=int, nargs="+", default=[100, 300, 600], help="Sizes of the generated PDFs")
+    parser.add_argument("--pdf", nargs="*", default=[], help="Benchmark these PDFs instead of generated ones")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.pdf:
+        run(args.pdf, args.workers, args.repeat)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for pages in args.pages:
+                path = os.path.join(directory, f"judgment_{pages}p.pdf")
+                generate_pdf(path, pages)
+                paths.append(path)
+            run(paths, args.workers, args.repeat)
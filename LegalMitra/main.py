@@ -1,6 +1,6 @@
-import os
+import itertools
 import streamlit as st
-from utils.pdf_processor import extract_text_from_pdf, chunk_text
+from utils.pdf_processor import iter_pages, iter_structured_chunks
 from utils.api_handler import analyze_legal_text, combine_legal_analyses, is_legal_document, find_similar_cases
 from dotenv import load_dotenv
 
@@ -21,43 +21,47 @@ with tab1:
 
     if uploaded_file and st.button("Analyze"):
         with st.spinner("Processing document..."):
-            # Save temp file
-            temp_path = f"temp_{uploaded_file.name}"
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            
-            # Process PDF
-            if text := extract_text_from_pdf(temp_path):
-                os.remove(temp_path)
+            # Process PDF straight from the upload (large files are spooled to a temp file instead):
+            # chunks follow the judgment's paragraphs and headings, and are produced while later
+            # pages are still being extracted
+            pages = iter_pages(uploaded_file)
+            try:
+                chunks = iter_structured_chunks(pages)
+                try:
+                    first_chunk = next(chunks, None)
+                except Exception:
+                    first_chunk = None
                 
+                if not first_chunk:
+                    st.error("Failed to extract text from PDF")
                 # First check if it's a legal document
-                if not is_legal_document(text[:2000]):  # Check first portion for efficiency
+                elif not is_legal_document(first_chunk[:2000]):  # Check first portion for efficiency
                     st.error("The uploaded document does not appear to be an Indian legal document. Please upload a valid legal document.")
                 else:
                     # Handle large docs
-                    if len(text.split()) > 2000:
-                        chunks = chunk_text(text)
-                        st.info(f"Document split into {len(chunks)} chunks for processing")
-                        
+                    second_chunk = next(chunks, None)
+                    if second_chunk is not None:
                         results = []
-                        progress_bar = st.progress(0)
+                        status = st.empty()
                         
-                        for i, chunk in enumerate(chunks):
+                        for i, chunk in enumerate(itertools.chain((first_chunk, second_chunk), chunks)):
+                            status.info(f"Analyzing chunk {i + 1}...")
                             chunk_result = analyze_legal_text(chunk, "summary", is_chunk=True)
                             results.append(chunk_result)
-                            progress_bar.progress((i+1)/len(chunks))
+                        status.info(f"Document processed in {len(results)} chunks")
                         
                         # Combine results intelligently instead of simple concatenation
                         result = combine_legal_analyses(results, "summary")
                     else:
-                        result = analyze_legal_text(text, "summary", is_chunk=False)
+                        result = analyze_legal_text(first_chunk, "summary", is_chunk=False)
                     
                     # Display
                     st.subheader("Results")
                     st.markdown(result)
                     st.download_button("Save Result", result, file_name="analysis.txt")
-            else:
-                st.error("Failed to extract text from PDF")
+            finally:
+                # Releases the document, and the spooled temp file if there is one
+                pages.close()
 
 with tab2:
     st.subheader("Case Research Assistant")
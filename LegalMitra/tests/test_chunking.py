@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from utils.pdf_processor import chunk_spans, chunk_text, iter_chunks, iter_structured_chunks
+
+TOKENS = (
+    "the appellant respondent court held that evidence was not proved before trial "
+    "Section 138 of the Act learned counsel submitted Ltd. Ors. v. Mr. Hon'ble paras "
+    "R. K. Sharma U.P. (a)"
+).split()
+BREAKS = ["JUDGMENT", "J U D G M E N T", "COMMON JUDGMENT", "ORDER", "O R D E R", "CONCLUSION"]
+SPACES = [" ", " ", " ", "  ", "\n", " \n "]
+
+def random_judgment(rng: random.Random, words: int) -> str:
+    parts = []
+    paragraph = 1
+    for _ in range(words):
+        roll = rng.random()
+        if roll < 0.01:
+            parts.append(rng.choice(BREAKS))
+        elif roll < 0.04:
+            parts.append(f"{paragraph}.")
+            paragraph += 1
+        elif roll < 0.15:
+            parts.append(rng.choice(TOKENS).capitalize() + rng.choice([".", "?", ".”", "!"]))
+        else:
+            parts.append(rng.choice(TOKENS))
+        parts.append(rng.choice(SPACES))
+    return "".join(parts)
+
+def random_pages(rng: random.Random, text: str):
+    cuts = sorted(rng.sample(range(1, len(text)), min(len(text) - 1, rng.randint(0, 12))))
+    bounds = [0, *cuts, len(text)]
+    return [text[start:stop] for start, stop in zip(bounds, bounds[1:])]
+
+@pytest.mark.parametrize("seed", range(200))
+def test_streamed_chunks_match_chunk_spans(seed):
+    rng = random.Random(seed)
+    pages = random_pages(rng, random_judgment(rng, rng.randint(1, 3000)))
+    max_tokens = rng.choice([20, 50, 200, 600])
+    text = "\n".join(pages)
+
+    streamed = list(iter_structured_chunks(pages, max_tokens=max_tokens))
+
+    assert streamed == [text[start:end] for start, end in chunk_spans(text, max_tokens=max_tokens)]
+
+def test_spans_cover_the_text_once_within_budget():
+    rng = random.Random(7)
+    text = random_judgment(rng, 5000)
+    spans = chunk_spans(text, max_tokens=300)
+
+    assert all(end - start <= 300 * 4 for start, end in spans)
+    assert [word for start, end in spans for word in text[start:end].split()] == text.split()
+
+def test_chunks_end_before_headings_and_numbered_paragraphs():
+    paragraphs = [f"{number}. " + "The appellant relied on the lease deed. " * 12 for number in range(1, 9)]
+    text = " ".join(paragraphs[:4]) + " ORDER " + " ".join(paragraphs[4:])
+    spans = chunk_spans(text, max_tokens=300)
+
+    starts = [text[start:start + 5] for start, _ in spans]
+    assert starts[0] == "1. Th"
+    assert all(start[0].isdigit() or start.startswith("ORDER") for start in starts)
+
+def test_abbreviations_and_initials_are_not_sentence_ends():
+    text = "Ram v. State of U.P. and Ors. was decided by Mr. Justice R. K. Sharma. Appeal allowed."
+    cut = text.index("Appeal")
+
+    assert chunk_spans(text, max_tokens=20, min_fill=0.0) == [(0, cut - 1), (cut, len(text))]
+
+def test_empty_input():
+    assert chunk_spans("") == []
+    assert list(iter_structured_chunks([])) == []
+    assert list(iter_structured_chunks(["", " "])) == []
+
+@pytest.mark.parametrize("seed", range(200))
+def test_streamed_word_chunks_match_chunk_text(seed):
+    rng = random.Random(seed)
+    max_words = rng.randint(2, 12)
+    overlap = rng.randint(0, max_words - 1)
+    words = [f"w{i}" for i in range(rng.randint(1, 60))]
+    text = " ".join(words)
+    cuts = sorted(rng.choices(range(len(words) + 1), k=rng.randint(0, 8)))
+    pages = [" ".join(words[start:stop]) for start, stop in zip([0, *cuts], [*cuts, len(words)])]
+
+    streamed = list(iter_chunks(pages, max_words, overlap))
+
+    assert streamed == chunk_text(text, max_words, overlap)
+
+def test_word_chunks_keep_the_trailing_overlap_chunks():
+    words = " ".join(f"w{i}" for i in range(12))
+
+    assert list(iter_chunks([words], max_words=5, overlap=3)) == [
+        "w0 w1 w2 w3 w4", "w2 w3 w4 w5 w6", "w4 w5 w6 w7 w8", "w6 w7 w8 w9 w10", "w8 w9 w10 w11", "w10 w11",
+    ]
+    assert list(iter_chunks(["w0 w1", "w2"], max_words=3, overlap=1)) == ["w0 w1 w2"]
+    with pytest.raises(ValueError):
+        list(iter_chunks([words], max_words=5, overlap=5))
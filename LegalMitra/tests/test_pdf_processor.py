@@ -0,0 +1,45 @@
+import io
+import os
+
+import fitz  # PyMuPDF
+import pytest
+
+from benchmarks.pdf_extraction import generate_pdf
+from utils import pdf_processor
+from utils.pdf_processor import _as_path, extract_text_from_pdf, iter_pages
+
+@pytest.fixture(scope="module")
+def pdf_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("pdf") / "judgment.pdf")
+    generate_pdf(path, pages=40, words_per_page=120)
+    return path
+
+def test_parallel_extraction_of_an_upload_matches_serial(pdf_path, caplog):
+    with open(pdf_path, "rb") as f:
+        contents = f.read()
+    serial = list(iter_pages(pdf_path, parallel=False))
+    assert list(iter_pages(io.BytesIO(contents), parallel=True, workers=2)) == serial
+    assert list(iter_pages(contents, parallel=True, workers=2)) == serial
+    assert "Parallel extraction failed" not in caplog.text
+
+def test_in_memory_pdf_is_spooled_once_and_removed(pdf_path):
+    with open(pdf_path, "rb") as f:
+        contents = f.read()
+    with _as_path(contents) as path:
+        with open(path, "rb") as f:
+            assert f.read() == contents
+    assert not os.path.exists(path)
+    with _as_path(pdf_path) as path:
+        assert path == pdf_path
+
+def test_extract_text_opens_the_document_once(pdf_path, monkeypatch):
+    expected = "\n".join(iter_pages(pdf_path, parallel=False))
+    opened = []
+    real_open = fitz.open
+    monkeypatch.setattr(pdf_processor.fitz, "open", lambda *args, **kwargs: opened.append(args) or real_open(*args, **kwargs))
+    assert extract_text_from_pdf(pdf_path, parallel=False) == expected
+    assert len(opened) == 1
+
+def test_extract_text_rejects_missing_and_empty_pdfs(tmp_path):
+    assert extract_text_from_pdf(str(tmp_path / "missing.pdf")) is None
+    assert extract_text_from_pdf(b"not a pdf") is None
@@ -1,15 +1,15 @@
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import os
+import itertools
 import json
-import tempfile
+import logging
 from collections import deque
 import threading
 from typing import Dict, Any, List
-import time
 
 # Import from your modules
-from pdf_processor import extract_text_from_pdf, chunk_text
+from pdf_processor import iter_pages, iter_structured_chunks, chunk_spans
 from api_handler import (
     analyze_legal_text, 
     combine_legal_analyses, 
@@ -17,6 +17,8 @@ from api_handler import (
     find_similar_cases
 )
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
 
@@ -47,8 +49,8 @@ def analyze_document():
     # Initialize session if needed
     init_user_session(user_id)
     
+    pages = None
     try:
-        text = None
         # Check if there's a file upload
         if 'file' in request.files:
             print("PDF file provided") # Added debug print
@@ -62,42 +64,32 @@ def analyze_document():
             if not file.filename.endswith('.pdf'):
                 return jsonify({"error": "Only PDF files are supported"}), 400
                 
-            # Create a temporary file with a unique name
-            temp_dir = tempfile.gettempdir()
-            temp_path = os.path.join(temp_dir, f"legal_analysis_{user_id}_{int(time.time())}.pdf")
-            
+            # The upload is parsed from memory (or spooled to a temp file above PDF_IN_MEMORY_MAX_BYTES).
+            # Pages are extracted lazily, so analysis of the first chunks starts before the
+            # whole document has been read
+            pages = iter_pages(file.stream)
+            chunks = iter_structured_chunks(pages)
             try:
-                # Save the uploaded PDF to the temp file
-                file.save(temp_path)
-                
-                # Validate the PDF file
-                if not os.path.exists(temp_path):
-                    return jsonify({"error": "Failed to save PDF file"}), 500
-                    
-                # Extract text from the PDF
-                text = extract_text_from_pdf(temp_path)
-                if not text:
-                    return jsonify({
-                        "error": "Could not extract text from PDF. The file might be corrupted or scanned.",
-                        "result": "Please ensure the PDF contains selectable text."
-                    }), 400
-                    
-            finally:
-                # Clean up - make sure this happens even if extraction fails
-                try:
-                    if os.path.exists(temp_path):
-                        os.unlink(temp_path)
-                except Exception as e:
-                    logger.error(f"Warning: Failed to delete temporary file: {e}")
+                first_chunk = next(chunks, None)
+            except Exception as e:
+                logger.error(f"PDF processing error: {str(e)}")
+                first_chunk = None
+            if not first_chunk:
+                return jsonify({
+                    "error": "Could not extract text from PDF. The file might be corrupted or scanned.",
+                    "result": "Please ensure the PDF contains selectable text."
+                }), 400
         else:
             # Get text directly from form
             text = request.form.get('text', '')
+            chunks = (text[start:end] for start, end in chunk_spans(text))
+            first_chunk = next(chunks, None)
         
-        if not text:
+        if not first_chunk:
             return jsonify({"error": "No content provided"}), 400
         
         # Check if it's a legal document
-        if not is_legal_document(text):
+        if not is_legal_document(first_chunk):
             return jsonify({
                 "error": "The document doesn't appear to be a legal document.",
                 "result": "Please upload a legal document for analysis."
@@ -105,11 +97,11 @@ def analyze_document():
         
         # Process document in chunks if it's large
         result = ""
-        if len(text.split()) > 1500:
-            chunks = chunk_text(text)
+        second_chunk = next(chunks, None)
+        if second_chunk is not None:
             chunk_results = []
             
-            for i, chunk in enumerate(chunks):
+            for chunk in itertools.chain((first_chunk, second_chunk), chunks):
                 chunk_result = analyze_legal_text(chunk, task_type, is_chunk=True)
                 chunk_results.append(chunk_result)
                 
@@ -117,13 +109,13 @@ def analyze_document():
             result = combine_legal_analyses(chunk_results, task_type)
         else:
             # Process document in one go
-            result = analyze_legal_text(text, task_type)
+            result = analyze_legal_text(first_chunk, task_type)
         
         # Store this query and result in user history
         store_user_interaction(user_id, {
             "type": "document_analysis",
             "task": task_type,
-            "document_preview": text[:200] + "...",  # Store a preview
+            "document_preview": first_chunk[:200] + "...",  # Store a preview
             "result": result
         })
         
@@ -134,6 +126,10 @@ def analyze_document():
     except Exception as e:
         logger.error(f"Error in analyze_document: {str(e)}")
         return jsonify({"error": str(e)}), 500
+    finally:
+        # Clean up the document and any spooled temp file, even if extraction fails
+        if pages is not None:
+            pages.close()
 
 @app.route('/api/find-similar-cases', methods=['POST'])
 def similar_cases_api():
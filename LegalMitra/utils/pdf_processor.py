@@ -1,6 +1,13 @@
+import bisect
 import fitz  # PyMuPDF
+import itertools
 import re
-from typing import Optional, List
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterable, Iterator, Optional, List, Tuple, Union
 import logging
 import os
 
@@ -8,63 +15,247 @@ import os
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def extract_text_from_pdf(pdf_path: str) -> Optional[str]:
+# Cleanup applied to every page: collapse whitespace, re-join hyphenated words, drop control characters
+WHITESPACE_PATTERN = re.compile(r'\s+')
+HYPHENATION_PATTERN = re.compile(r'(\w)-\s+(\w)')
+CONTROL_CHARS_PATTERN = re.compile(r'[\x00-\x1F\x7F-\x9F]')
+
+# Documents with at least this many pages are extracted by a process pool when more than one CPU is available.
+# Starting the pool costs as much as extracting a few hundred pages serially, so only long documents
+# qualify; calibrate on the deployment's hardware with benchmarks/pdf_extraction.py
+PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "256"))
+# Pages per shard below which extra workers cost more to start than they save
+MIN_PAGES_PER_WORKER = 16
+
+# Uploads up to this size are parsed straight from memory; larger ones are spooled to a temp file
+IN_MEMORY_MAX_BYTES = int(os.getenv("PDF_IN_MEMORY_MAX_BYTES", str(32 * 1024 * 1024)))
+
+# A PDF given as a path, its contents, or a binary file-like object (e.g. an upload stream)
+PdfSource = Union[str, os.PathLike, bytes, bytearray, BinaryIO]
+
+# Token budget per chunk for the structure-aware chunker, and the rough size of a token in characters
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "3000"))
+CHARS_PER_TOKEN = 4
+# Text kept on either side of a chunk boundary when chunking a stream, so split points near it are found as in the whole text
+STREAM_MARGIN = 256
+
+# Places a judgment can be split, strongest first: headings, numbered paragraphs, sentence ends.
+# Extracted pages have their whitespace collapsed, so none of these rely on line breaks.
+HEADING_PATTERN = re.compile(
+    r'(?<!\w)(?:(?:COMMON|ORAL|FINAL|REPORTABLE)\s+)?'
+    r'(?:J\s?U\s?D\s?G\s?E?\s?M\s?E\s?N\s?T|O\s?R\s?D\s?E\s?R|CONCLUSION|HEADNOTE)(?!\w)'
+)
+NUMBERED_PARAGRAPH_PATTERN = re.compile(
+    r'(?:^\s*|(?<=[.:;?!"\u201d])\s+)(\(?\d{1,3}[.)]\s+)(?=[A-Z(\u201c"\'])', re.MULTILINE
+)
+SENTENCE_END_PATTERN = re.compile(r'(\w*)[.?!]["\u201d\')]*\s+(?=[A-Z(\u201c"\'])')
+# Words that end in a full stop without ending the sentence ("Mr. Justice", "State of U.P. v. Ram")
+ABBREVIATIONS = frozenset(
+    "v vs no nos sec secs s art arts cl ch r o mr mrs ms dr smt sh shri sri ble hon ltd pvt co corp "
+    "inc j jj cj ors anr viz etc para paras pp p vol ed rs st sr govt dept ibid supra cf".split()
+)
+
+def clean_page_text(page_text: str) -> str:
+    """Clean up common OCR/PDF extraction issues in one page of text"""
+    page_text = WHITESPACE_PATTERN.sub(' ', page_text)
+    page_text = HYPHENATION_PATTERN.sub(r'\1\2', page_text)
+    return CONTROL_CHARS_PATTERN.sub('', page_text)
+
+def _extract_pages(doc, start: int, stop: int) -> List[Optional[str]]:
+    """Cleaned text of pages [start, stop) of an open document; None for pages without text"""
+    pages = []
+    for page_num in range(start, stop):
+        try:
+            # Extract text with layout preservation
+            page_text = doc[page_num].get_text("text")
+            
+            # Basic validation of extracted text
+            if not page_text.strip():
+                logger.warning(f"No text extracted from page {page_num + 1}")
+                pages.append(None)
+                continue
+                
+            pages.append(clean_page_text(page_text))
+        except Exception as page_error:
+            logger.error(f"Error processing page {page_num + 1}: {str(page_error)}")
+            pages.append(None)
+    return pages
+
+def _extract_page_range(path: str, start: int, stop: int) -> List[Optional[str]]:
+    """Process pool worker: open the document in this process and extract one shard of pages"""
+    with fitz.open(path) as doc:
+        return _extract_pages(doc, start, stop)
+
+def _open_pdf(source: Union[str, bytes]):
+    """Open a path or in-memory PDF"""
+    if isinstance(source, (bytes, bytearray)):
+        return fitz.open(stream=source, filetype="pdf")
+    return fitz.open(source)
+
+@contextmanager
+def pdf_source(source: PdfSource, max_in_memory: int = IN_MEMORY_MAX_BYTES) -> Iterator[Union[str, bytes]]:
+    """
+    Resolve a PDF source to something that can be opened without further copies
+    
+    Paths and bytes are used as they are. A file-like object is read into memory from its
+    current position, unless it holds more than `max_in_memory` bytes; then it is copied to
+    a temp file, which is deleted on exit.
+    
+    Args:
+        source: Path, PDF contents, or binary file-like object
+        max_in_memory: Largest upload parsed from memory, in bytes
+    
+    Yields:
+        Path or bytes for fitz to open
+    """
+    if isinstance(source, (str, os.PathLike)):
+        yield os.fspath(source)
+        return
+    if isinstance(source, (bytes, bytearray)):
+        yield source
+        return
+    
+    # Read one byte past the limit to tell whether the upload fits, without knowing its size up front
+    head = source.read(max_in_memory + 1)
+    if len(head) <= max_in_memory:
+        yield head
+        return
+    
+    temp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with temp:
+            temp.write(head)
+            del head
+            shutil.copyfileobj(source, temp)
+        yield temp.name
+    finally:
+        try:
+            os.unlink(temp.name)
+        except OSError as e:
+            logger.error(f"Failed to delete temporary file: {e}")
+
+@contextmanager
+def _as_path(resolved: Union[str, bytes]) -> Iterator[str]:
+    """A path to the resolved PDF; in-memory contents are written to a temp file once, so
+    pool workers are sent its name rather than a copy of the document each"""
+    if isinstance(resolved, str):
+        yield resolved
+        return
+    
+    temp = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        with temp:
+            temp.write(resolved)
+        yield temp.name
+    finally:
+        try:
+            os.unlink(temp.name)
+        except OSError as e:
+            logger.error(f"Failed to delete temporary file: {e}")
+
+def _page_ranges(page_count: int, workers: int) -> List[Tuple[int, int]]:
+    """Split the pages into contiguous shards, a few per worker so a slow shard does not hold up the rest"""
+    shards = min(workers * 4, max(1, page_count // MIN_PAGES_PER_WORKER))
+    size = -(-page_count // shards)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+def _iter_doc_pages(doc, resolved: Union[str, bytes], parallel: Optional[bool], workers: Optional[int]) -> Iterator[str]:
+    """iter_pages on a document that is already open; `resolved` is where it was opened from"""
+    page_count = doc.page_count
+    workers = workers or os.cpu_count() or 1
+    if parallel is None:
+        parallel = workers > 1 and page_count >= PARALLEL_MIN_PAGES
+    
+    next_page = 0
+    if parallel and page_count:
+        pool = None
+        try:
+            with _as_path(resolved) as path:
+                ranges = _page_ranges(page_count, workers)
+                pool = ProcessPoolExecutor(max_workers=min(workers, len(ranges)))
+                pending = deque()
+                for start, stop in ranges:
+                    pending.append((stop, pool.submit(_extract_page_range, path, start, stop)))
+                    # Shards are consumed in page order regardless of which one finishes first
+                    while pending and (len(pending) >= workers * 2 or stop == page_count):
+                        shard_stop, future = pending.popleft()
+                        shard = future.result()
+                        next_page = shard_stop
+                        for page_text in shard:
+                            if page_text is not None:
+                                yield page_text
+        except Exception as pool_error:
+            # e.g. no process support in this environment; carry on serially from the failed shard
+            logger.warning(f"Parallel extraction failed, extracting serially: {str(pool_error)}")
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+    
+    for page_num in range(next_page, page_count):
+        page_text = _extract_pages(doc, page_num, page_num + 1)[0]
+        if page_text is not None:
+            yield page_text
+
+def iter_pages(source: PdfSource, parallel: Optional[bool] = None, workers: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the cleaned text of each page, in order, as soon as it is extracted
+    
+    Pages without text are skipped. In parallel mode at most two shards per worker are in
+    flight, so a slow consumer does not make the whole document pile up in memory. Workers
+    open the document by path; an upload held in memory is written to a temp file for them.
+    
+    Args:
+        source: Path, PDF contents, or binary file-like object (see pdf_source)
+        parallel: Extract page ranges in a process pool; by default this is chosen
+            from the page count (PARALLEL_MIN_PAGES) and the number of CPUs
+        workers: Number of worker processes (defaults to the CPU count)
+        
+    Yields:
+        Text of each page that has any
+    """
+    with pdf_source(source) as resolved, _open_pdf(resolved) as doc:
+        yield from _iter_doc_pages(doc, resolved, parallel, workers)
+
+def extract_text_from_pdf(source: PdfSource, parallel: Optional[bool] = None, workers: Optional[int] = None) -> Optional[str]:
     """
     Extract text from PDF with improved error handling, validation, and cleanup
     
     Args:
-        pdf_path: Path to the PDF file
+        source: Path, PDF contents, or binary file-like object (see pdf_source)
+        parallel: Extract page ranges in a process pool; by default this is chosen
+            from the page count (PARALLEL_MIN_PAGES) and the number of CPUs
+        workers: Number of worker processes (defaults to the CPU count)
         
     Returns:
         Extracted text as string or None if extraction fails
     """
     try:
         # Validate PDF file
-        if not os.path.exists(pdf_path):
-            logger.error(f"PDF file not found: {pdf_path}")
+        if isinstance(source, (str, os.PathLike)) and not os.path.exists(source):
+            logger.error(f"PDF file not found: {source}")
             return None
             
         # Open PDF document
-        with fitz.open(pdf_path) as doc:
+        with pdf_source(source) as resolved, _open_pdf(resolved) as doc:
             # Check if document is valid and not empty
             if doc.page_count == 0:
                 logger.error("PDF document is empty")
                 return None
-                
-            text_blocks = []
-            for page_num, page in enumerate(doc):
-                try:
-                    # Extract text with layout preservation
-                    page_text = page.get_text("text")
-                    
-                    # Basic validation of extracted text
-                    if not page_text.strip():
-                        logger.warning(f"No text extracted from page {page_num + 1}")
-                        continue
-                        
-                    # Clean up common OCR/PDF extraction issues
-                    page_text = re.sub(r'\s+', ' ', page_text)  # Remove excessive whitespace
-                    page_text = re.sub(r'(\w)-\s+(\w)', r'\1\2', page_text)  # Fix hyphenated words
-                    page_text = re.sub(r'[\x00-\x1F\x7F-\x9F]', '', page_text)  # Remove control characters
-                    
-                    text_blocks.append(page_text)
-                except Exception as page_error:
-                    logger.error(f"Error processing page {page_num + 1}: {str(page_error)}")
-                    continue
             
-            if not text_blocks:
-                logger.error("No text could be extracted from the PDF")
-                return None
-                
-            # Combine all text blocks
-            full_text = "\n".join(text_blocks)
+            text_blocks = list(_iter_doc_pages(doc, resolved, parallel, workers))
+        if not text_blocks:
+            logger.error("No text could be extracted from the PDF")
+            return None
             
-            # Final validation
-            if len(full_text.strip()) < 10:  # Arbitrary minimum length
-                logger.error("Extracted text is too short to be valid")
-                return None
-                
-            return full_text
+        # Combine all text blocks
+        full_text = "\n".join(text_blocks)
+        
+        # Final validation
+        if len(full_text.strip()) < 10:  # Arbitrary minimum length
+            logger.error("Extracted text is too short to be valid")
+            return None
+            
+        return full_text
             
     except Exception as e:
         logger.error(f"PDF processing error: {str(e)}")
@@ -104,4 +295,172 @@ def chunk_text(text: str, max_words: int = 1500, overlap: int = 200) -> List[str
         if start >= len(words):
             break
     
-    return chunks
\ No newline at end of file
+    return chunks
+
+def iter_chunks(pages: Iterable[str], max_words: int = 1500, overlap: int = 200) -> Iterator[str]:
+    """
+    Split a stream of text (e.g. from iter_pages) into word-based chunks with overlap,
+    yielding each chunk as soon as its words have arrived
+    
+    Chunk boundaries are the same as chunk_text on the joined text, but only about one
+    chunk of words is held at a time. Words are re-joined with single spaces, so unlike
+    chunk_text a short text does not come back verbatim.
+    
+    Args:
+        pages: Pieces of text in document order
+        max_words: Maximum words per chunk
+        overlap: Number of words to overlap between chunks
+    
+    Yields:
+        Text chunks
+    """
+    step = max_words - overlap
+    if step <= 0:
+        raise ValueError("overlap must be smaller than max_words")
+    
+    words = deque()
+    emitted = False
+    for page in pages:
+        words.extend(page.split())
+        # A text of exactly max_words is one chunk, so the first chunk waits for one word more
+        while len(words) > max_words or (emitted and len(words) >= max_words):
+            yield ' '.join(itertools.islice(words, max_words))
+            emitted = True
+            for _ in range(step):
+                words.popleft()
+    
+    if not emitted:
+        if words:
+            yield ' '.join(words)
+        return
+    # Like chunk_text, a chunk starts every `step` words until the text runs out, so a large
+    # overlap leaves several shorter chunks at the end
+    while words:
+        yield ' '.join(itertools.islice(words, max_words))
+        for _ in range(min(step, len(words))):
+            words.popleft()
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _split_points(text: str) -> Dict[int, int]:
+    """Offsets where text may be split, mapped to their strength (0 = heading, 1 = numbered paragraph, 2 = sentence)"""
+    points: Dict[int, int] = {}
+    for match in SENTENCE_END_PATTERN.finditer(text):
+        word = match.group(1)
+        # Single letters are initials ("R. K. Sharma")
+        if len(word) > 1 and word.lower() not in ABBREVIATIONS:
+            points[match.end()] = 2
+    for match in NUMBERED_PARAGRAPH_PATTERN.finditer(text):
+        points[match.start(1)] = 1
+    for match in HEADING_PATTERN.finditer(text):
+        points[match.start()] = 0
+    return points
+
+def _span_end(text: str, points: List[Tuple[int, int]], start: int, max_chars: int, min_fill: float) -> int:
+    """Offset where the chunk starting at `start` ends (see chunk_spans); `points` are sorted split points"""
+    if len(text) - start <= max_chars:
+        return len(text)
+    low, high = start + int(max_chars * min_fill), start + max_chars
+    candidates = [
+        (strength, -offset)
+        for offset, strength in points[bisect.bisect_left(points, (low,)):bisect.bisect_right(points, (high, 3))]
+    ]
+    if candidates:
+        return -min(candidates)[1]
+    space = text.rfind(' ', low, high)
+    return space if space > start else high
+
+def _strip_span(text: str, start: int, end: int) -> Optional[Tuple[int, int]]:
+    """Narrow [start, end) to exclude surrounding whitespace; None if nothing is left"""
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return (start, end) if start < end else None
+
+def chunk_spans(text: str, max_tokens: int = CHUNK_TOKEN_BUDGET, min_fill: float = 0.5) -> List[Tuple[int, int]]:
+    """
+    Split text into chunks that follow the structure of a judgment, packed up to a token budget
+    
+    Each chunk ends at the strongest split point (heading, then numbered paragraph, then
+    sentence end) that keeps it at least `min_fill` of the budget, so chunks are full and
+    do not need overlapping words for context. A stretch with no split point at all is cut
+    at a space.
+    
+    Args:
+        text: The text to split
+        max_tokens: Token budget per chunk
+        min_fill: Fraction of the budget a chunk must reach before it may end
+    
+    Returns:
+        (start, end) character offsets of each chunk in text, surrounding whitespace excluded
+    """
+    if not text or not isinstance(text, str):
+        logger.error("Invalid text input for chunking")
+        return []
+    
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    points = sorted(_split_points(text).items())
+    spans = []
+    start = 0
+    while start < len(text):
+        end = _span_end(text, points, start, max_chars, min_fill)
+        span = _strip_span(text, start, end)
+        if span is not None:
+            spans.append(span)
+        start = end
+    return spans
+
+def iter_structured_chunks(
+    pages: Iterable[str],
+    max_tokens: int = CHUNK_TOKEN_BUDGET,
+    min_fill: float = 0.5
+) -> Iterator[str]:
+    """
+    Streaming chunk_spans: yield structure-aware chunks of a stream of text (e.g. from iter_pages)
+    as soon as enough of the text after them has arrived
+    
+    The chunks are the same as chunk_spans on the pages joined with newlines, provided no
+    word or run of whitespace is longer than STREAM_MARGIN characters (always the case for
+    iter_pages, which collapses whitespace). Only the text from just before the next chunk
+    onwards is held in memory.
+    
+    Args:
+        pages: Pieces of text in document order
+        max_tokens: Token budget per chunk
+        min_fill: Fraction of the budget a chunk must reach before it may end
+    
+    Yields:
+        Text chunks
+    """
+    max_chars = max(1, max_tokens * CHARS_PER_TOKEN)
+    buffer = None
+    start = 0
+    for page in pages:
+        buffer = page if buffer is None else f"{buffer}\n{page}"
+        if len(buffer) - start < max_chars + STREAM_MARGIN:
+            continue
+        points = sorted(_split_points(buffer).items())
+        # A chunk is final once the text a full budget past its start, plus a margin for the
+        # split patterns' look-ahead, has arrived
+        while len(buffer) - start >= max_chars + STREAM_MARGIN:
+            end = _span_end(buffer, points, start, max_chars, min_fill)
+            span = _strip_span(buffer, start, end)
+            if span is not None:
+                yield buffer[span[0]:span[1]]
+            start = end
+        # Split points are found with look-behinds, so some text before the next chunk is kept
+        keep = max(0, start - STREAM_MARGIN)
+        buffer, start = buffer[keep:], start - keep
+    
+    if buffer is None:
+        return
+    points = sorted(_split_points(buffer).items())
+    while start < len(buffer):
+        end = _span_end(buffer, points, start, max_chars, min_fill)
+        span = _strip_span(buffer, start, end)
+        if span is not None:
+            yield buffer[span[0]:span[1]]
+        start = end
@@ -0,0 +1,121 @@
+# admission.py
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator
+from .metrics import registry
+
+queue_depth = registry.gauge(
+    "ollama_admission_queue_depth",
+    "Generations waiting for a free Ollama slot"
+)
+active_generations = registry.gauge(
+    "ollama_admission_active_generations",
+    "Generations currently admitted to Ollama"
+)
+queue_wait_seconds = registry.histogram(
+    "ollama_admission_wait_seconds",
+    "Time generations spent waiting for admission"
+)
+rejected_total = registry.counter(
+    "ollama_admission_rejected_total",
+    "Generations rejected because the admission queue was full or the wait timed out"
+)
+
+# Set for callers (such as batch workers) that are already bounded and should wait instead of being rejected
+_patient: ContextVar[bool] = ContextVar("admission_patient", default=False)
+
+class AdmissionRejected(Exception):
+    """Raised when a generation cannot be admitted; maps to an HTTP 429/503 with Retry-After"""
+
+    def __init__(self, status_code: int, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.reason = reason
+
+class AdmissionController:
+    """Bounds concurrent Ollama generations and the queue of generations waiting for one.
+
+    When the queue is full new generations are rejected immediately with 429; generations
+    that wait longer than `queue_timeout` are rejected with 503. Both carry a Retry-After
+    estimated from the recent generation time.
+    """
+
+    def __init__(self, max_concurrent: int = 2, max_queue: int = 16, queue_timeout: float = 30.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.waiting = 0
+        self.active = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        # Exponentially weighted moving average of how long a generation holds its slot
+        self._average_duration = 5.0
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is expected to drain"""
+        backlog = self.waiting + self.active
+        return max(1, math.ceil(self._average_duration * backlog / self.max_concurrent))
+
+    @contextmanager
+    def patient(self) -> Iterator[None]:
+        """Within this block, generations wait for a slot instead of being rejected"""
+        token = _patient.set(True)
+        try:
+            yield
+        finally:
+            _patient.reset(token)
+
+    def _queue_full(self) -> AdmissionRejected:
+        rejected_total.inc()
+        return AdmissionRejected(429, self.retry_after(), "Too many pending analyses, please retry later")
+
+    def check(self) -> None:
+        """Reject a request whose generation would be rejected now, before it spends any
+        Kanoon calls or classification on the way there"""
+        if self._semaphore.locked() and self.waiting >= self.max_queue and not _patient.get():
+            raise self._queue_full()
+
+    async def _wait_for_slot(self, patient: bool) -> None:
+        if self.waiting >= self.max_queue and not patient:
+            raise self._queue_full()
+
+        self.waiting += 1
+        queue_depth.set(self.waiting)
+        start = time.perf_counter()
+        try:
+            if patient:
+                await self._semaphore.acquire()
+            else:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            rejected_total.inc()
+            raise AdmissionRejected(503, self.retry_after(), "Timed out waiting for the analysis engine")
+        finally:
+            self.waiting -= 1
+            queue_depth.set(self.waiting)
+            queue_wait_seconds.observe(time.perf_counter() - start)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold one generation slot for the duration of the block"""
+        patient = _patient.get()
+        if not self._semaphore.locked():
+            # A free slot is taken without suspending, so the check and the acquire cannot interleave
+            await self._semaphore.acquire()
+            queue_wait_seconds.observe(0.0)
+        else:
+            await self._wait_for_slot(patient)
+
+        self.active += 1
+        active_generations.set(self.active)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            active_generations.set(self.active)
+            self._semaphore.release()
+            self._average_duration = 0.8 * self._average_duration + 0.2 * (time.perf_counter() - started)
@@ -0,0 +1,190 @@
+# backends.py
+import asyncio
+import random
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Set
+import httpx
+from .metrics import registry
+
+backend_outstanding = registry.gauge(
+    "ollama_backend_outstanding_requests",
+    "Requests currently sent to each Ollama backend",
+    labelnames=("backend",)
+)
+backend_healthy = registry.gauge(
+    "ollama_backend_healthy",
+    "Whether each Ollama backend is in rotation (1) or ejected (0)",
+    labelnames=("backend",)
+)
+backend_ejections = registry.counter(
+    "ollama_backend_ejections_total",
+    "Times an Ollama backend was taken out of rotation",
+    labelnames=("backend",)
+)
+backend_retries = registry.counter(
+    "ollama_backend_retries_total",
+    "Requests retried on another Ollama backend after a connection failure"
+)
+
+# Failures where the request never reached Ollama (or the connection dropped), so it is safe to resend
+CONNECTION_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+class Backend:
+    """One Ollama server (base URL ending in /api) and its routing state"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.outstanding = 0
+        self.healthy = True
+        backend_healthy.labels(backend=self.url).set(1)
+
+    def eject(self, reason: str) -> None:
+        if self.healthy:
+            print(f"Ejecting Ollama backend {self.url}: {reason}")
+            backend_ejections.labels(backend=self.url).inc()
+        self.healthy = False
+        backend_healthy.labels(backend=self.url).set(0)
+
+    def readmit(self) -> None:
+        if not self.healthy:
+            print(f"Re-admitting Ollama backend {self.url}")
+        self.healthy = True
+        backend_healthy.labels(backend=self.url).set(1)
+
+class BackendPool:
+    """Routes requests to the healthy Ollama backend with the fewest outstanding requests.
+
+    Backends are ejected on a connection failure or a failed health check and re-admitted
+    by the next health check (or request) that succeeds. If every backend is ejected they are all tried
+    anyway, since a request that might succeed beats one that certainly fails.
+    """
+
+    def __init__(self, urls: List[str], health_interval: float = 10.0, health_timeout: float = 2.0):
+        if not urls:
+            raise ValueError("At least one Ollama backend URL is required")
+        self.backends = [Backend(url) for url in urls]
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self._health_task: Optional[asyncio.Task] = None
+
+    def start(self, client: httpx.AsyncClient) -> None:
+        """Start the background health checks (only useful with more than one backend)"""
+        if self._health_task is None and len(self.backends) > 1 and self.health_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop(client))
+
+    async def close(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            await asyncio.gather(self._health_task, return_exceptions=True)
+            self._health_task = None
+
+    async def check(self, client: httpx.AsyncClient, backend: Backend) -> None:
+        try:
+            response = await client.get(f"{backend.url}/tags", timeout=self.health_timeout)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            backend.eject(f"health check failed: {str(e) or type(e).__name__}")
+            return
+        backend.readmit()
+
+    async def _health_loop(self, client: httpx.AsyncClient) -> None:
+        while True:
+            await asyncio.gather(*(self.check(client, backend) for backend in self.backends))
+            await asyncio.sleep(self.health_interval)
+
+    def pick(self, exclude: Set[Backend], prefer: Optional[str] = None) -> Optional[Backend]:
+        candidates = [backend for backend in self.backends if backend not in exclude]
+        healthy = [backend for backend in candidates if backend.healthy]
+        if healthy:
+            candidates = healthy
+        if not candidates:
+            return None
+        # A preferred backend (e.g. the one holding a conversation's KV cache) wins while it is usable
+        for backend in candidates:
+            if backend.url == prefer:
+                return backend
+        # Ties are broken randomly so idle backends share the load evenly
+        return min(candidates, key=lambda backend: (backend.outstanding, random.random()))
+
+    @asynccontextmanager
+    async def lease(self, backend: Backend) -> AsyncIterator[Backend]:
+        """Count a request against the backend for as long as it runs"""
+        gauge = backend_outstanding.labels(backend=backend.url)
+        backend.outstanding += 1
+        gauge.inc()
+        try:
+            yield backend
+        finally:
+            backend.outstanding -= 1
+            gauge.dec()
+
+    def backend_for(self, url: str) -> Optional[str]:
+        """Base URL of the backend a request URL was sent to"""
+        for backend in self.backends:
+            if url.startswith(backend.url + "/"):
+                return backend.url
+        return None
+
+    def _next(self, tried: Set[Backend], error: Optional[Exception], prefer: Optional[str] = None) -> Backend:
+        backend = self.pick(tried, prefer)
+        if backend is None:
+            raise error
+        if tried:
+            backend_retries.inc()
+        tried.add(backend)
+        return backend
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        prefer: Optional[str] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """Send a request to the least loaded (or `prefer`red) backend, retrying on the others
+        after connection failures"""
+        tried: Set[Backend] = set()
+        error: Optional[Exception] = None
+        while True:
+            backend = self._next(tried, error, prefer)
+            async with self.lease(backend):
+                try:
+                    response = await client.request(method, f"{backend.url}/{path}", **kwargs)
+                except CONNECTION_ERRORS as e:
+                    backend.eject(str(e) or type(e).__name__)
+                    error = e
+                    continue
+            backend.readmit()
+            return response
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        path: str,
+        prefer: Optional[str] = None,
+        **kwargs
+    ) -> AsyncIterator[httpx.Response]:
+        """Like request() for a streamed response; only opening the stream is retried, since
+        tokens already passed to the caller cannot be taken back"""
+        tried: Set[Backend] = set()
+        error: Optional[Exception] = None
+        while True:
+            backend = self._next(tried, error, prefer)
+            async with self.lease(backend):
+                try:
+                    response = await client.send(
+                        client.build_request(method, f"{backend.url}/{path}", **kwargs), stream=True
+                    )
+                except CONNECTION_ERRORS as e:
+                    backend.eject(str(e) or type(e).__name__)
+                    error = e
+                    continue
+                backend.readmit()
+                try:
+                    yield response
+                finally:
+                    await response.aclose()
+                return
@@ -0,0 +1,137 @@
+# cache.py
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+class CachedSearch:
+    """A cached Kanoon search result and how old it is"""
+
+    def __init__(self, docs: List[Dict[str, Any]], age: float, ttl: float, stale_ttl: float):
+        self.docs = docs
+        self.age = age
+        self.fresh = age < ttl
+        # Within the stale-while-revalidate window the entry is served while a refresh runs
+        self.revalidate = not self.fresh and age < ttl + stale_ttl
+
+class SearchCache:
+    """Persistent SQLite cache of Kanoon search results with TTL, stale-while-revalidate and LRU eviction"""
+
+    def __init__(self, path: str, ttl: float = 86400.0, stale_ttl: float = 7 * 86400.0, max_entries: int = 5000):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _open(self) -> sqlite3.Connection:
+        """Connect, creating the database if needed (called with the lock held)"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS search_cache (
+                    key TEXT PRIMARY KEY,
+                    docs TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def open(self) -> None:
+        """Open the database (called from the app lifespan; otherwise it is opened on first use)"""
+        with self._lock:
+            self._open()
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        """Normalize the query so trivially different spellings share an entry"""
+        normalized = re.sub(r"[^\w\s]", " ", query.lower())
+        normalized = " ".join(normalized.split())
+        return f"{max_results}:{normalized}"
+
+    def _get(self, key: str) -> Optional[CachedSearch]:
+        now = time.time()
+        with self._lock:
+            conn = self._open()
+            row = conn.execute(
+                "SELECT docs, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+        return CachedSearch(json.loads(row[0]), now - row[1], self.ttl, self.stale_ttl)
+
+    def _put(self, key: str, docs: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._open()
+            conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, docs, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(docs), now, now)
+            )
+            # Evict the least recently used entries beyond the size bound
+            conn.execute(
+                """DELETE FROM search_cache WHERE key IN (
+                    SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,)
+            )
+            conn.commit()
+
+    async def get(self, query: str, max_results: int) -> Optional[CachedSearch]:
+        return await asyncio.to_thread(self._get, self.make_key(query, max_results))
+
+    async def put(self, query: str, max_results: int, docs: List[Dict[str, Any]]) -> None:
+        await asyncio.to_thread(self._put, self.make_key(query, max_results), docs)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+class DocumentCache:
+    """In-memory LRU cache of full Kanoon documents bounded by their total serialized size"""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Dict[str, Any], int]]" = OrderedDict()
+
+    def get(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(doc_id)
+        if entry is None:
+            return None
+        self._entries.move_to_end(doc_id)
+        return entry[0]
+
+    def put(self, doc_id: str, document: Dict[str, Any]) -> None:
+        size = len(json.dumps(document))
+        if size > self.max_bytes:
+            return
+        if doc_id in self._entries:
+            self.size -= self._entries.pop(doc_id)[1]
+        self._entries[doc_id] = (document, size)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,170 @@
+# classifier.py
+import json
+import math
+import os
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+# Weights of words and phrases that indicate (positive) or argue against (negative) a legal matter
+LEGAL_VOCABULARY: Dict[str, float] = {
+    # Forums, people and filings
+    "court": 2.5, "high court": 3.0, "supreme court": 3.0, "district court": 3.0, "tribunal": 2.5,
+    "magistrate": 2.5, "judge": 2.0, "lawyer": 2.5, "advocate": 2.5, "police": 2.0, "fir": 3.0,
+    "petition": 2.5, "writ": 3.0, "appeal": 2.0, "suit": 1.5, "complaint": 1.5, "notice": 1.0,
+    "legal notice": 3.0, "summons": 3.0, "affidavit": 2.5, "plaintiff": 3.0, "defendant": 3.0,
+    "accused": 2.5, "respondent": 2.0, "petitioner": 2.5, "appellant": 2.5, "bail": 3.0,
+    "lawsuit": 3.0, "sue": 2.5, "hearing": 1.0, "judgment": 2.0, "decree": 2.5, "injunction": 3.0,
+    "arbitration": 2.5, "mediation": 1.5, "consumer forum": 3.0, "legal": 2.0, "illegal": 2.0,
+    "illegally": 2.0, "unlawful": 2.5, "law": 1.5, "rights": 1.0, "liable": 2.0, "liability": 2.0,
+    # Criminal matters
+    "theft": 2.5, "stolen": 1.5, "robbery": 2.5, "murder": 2.5, "assault": 2.5, "harassment": 2.0,
+    "cheating": 2.0, "fraud": 2.0, "forgery": 2.5, "extortion": 2.5, "bribe": 2.0, "dowry": 3.0,
+    "domestic violence": 3.0, "defamation": 3.0, "kidnapping": 2.5, "arrested": 2.5, "arrest": 2.0,
+    "crime": 2.0, "criminal": 2.0, "threaten": 1.0, "blackmail": 2.0, "forge": 2.5, "cheat": 2.0,
+    "harass": 1.5,
+    # Civil, property and family matters
+    "contract": 1.5, "agreement": 1.0, "breach": 2.0, "compensation": 1.5, "damages": 1.5,
+    "tenant": 1.5, "landlord": 1.5, "eviction": 2.5, "evict": 2.5, "lease": 1.5, "rent agreement": 2.0,
+    "property": 1.0, "encroachment": 2.5, "possession": 1.0, "title deed": 2.5, "sale deed": 2.5,
+    "inheritance": 2.0, "succession": 2.0, "divorce": 2.5, "custody": 2.0, "maintenance": 1.0,
+    "alimony": 3.0, "partition": 1.5, "cheque bounce": 3.0, "dishonoured": 2.0, "recovery": 1.0,
+    "dismissed": 1.0, "wrongful termination": 3.0, "wrongfully terminated": 3.0, "negligence": 2.0,
+    "insurance claim": 1.5, "refund": 0.5, "dispute": 1.5, "guardianship": 2.5, "will": 0.5,
+    "vacate": 1.5, "seize": 1.5, "adopt": 1.5, "adoption": 2.0, "provident fund": 2.0, "salary": 0.5,
+    "encroach": 2.5, "terminate": 2.0, "inherit": 1.5, "heir": 2.0, "premises": 1.5, "consumer": 1.5,
+    # Parties, money and conduct that usually mean a grievance against someone
+    "employer": 1.0, "builder": 1.0, "contractor": 1.0, "seller": 1.0, "shopkeeper": 1.0, "dealer": 1.0,
+    "neighbour": 1.0, "neighbor": 1.0, "refuse": 1.0, "without consent": 1.5, "consent": 0.5,
+    "deposit": 1.0, "advance": 0.5, "lakh": 1.0, "rupees": 0.5, "money": 0.5, "loan": 0.5,
+    "demand": 1.0, "false": 1.0, "fake": 1.0, "defective": 1.5, "accident": 1.0, "claim": 1.0,
+    "certificate": 0.5, "abandon": 0.5, "withdraw": 0.5, "account": 0.5, "cancel": 0.5,
+    # Everyday topics that are rarely legal matters
+    "recipe": -3.0, "cooking": -2.5, "bake": -2.5, "weather": -2.5, "movie": -2.0, "song": -2.0,
+    "cricket": -1.5, "football": -1.5, "poem": -3.0, "homework": -2.0, "workout": -2.5,
+    "vacation": -1.5, "holiday": -1.0, "birthday": -1.5, "restaurant": -1.0, "game": -1.0,
+    "programming": -2.5, "python": -2.5, "javascript": -2.5, "stock tips": -2.0, "horoscope": -3.0,
+    "diet": -2.0, "weight loss": -2.5, "hairstyle": -3.0, "travel itinerary": -3.0,
+}
+
+# Statute and provision mentions are strong evidence on their own
+STATUTE_PATTERNS: List[Tuple[re.Pattern, float]] = [
+    (re.compile(r"\b(?:section|sec\.?|s\.)\s*\d+[a-z]?\b"), 3.0),
+    (re.compile(r"\barticle\s+\d+[a-z]?\b"), 2.5),
+    (re.compile(r"\b(?:ipc|crpc|cpc|bns|bnss|bsa|ni act|posh|rera|pocso|ndps)\b"), 3.0),
+    (re.compile(r"\b[a-z]+(?: [a-z]+){0,4} act,? (?:18|19|20)\d\d\b"), 3.0),
+]
+
+TOKEN_PATTERN = re.compile(r"[a-z]+")
+MAX_PHRASE_WORDS = max(len(term.split()) for term in LEGAL_VOCABULARY)
+
+# Inflections tried, longest first, when a word is not in the vocabulary itself
+INFLECTION_SUFFIXES = ("ing", "ed", "es", "s", "d")
+
+def base_form(word: str) -> str:
+    """The vocabulary entry a word inflects ("encroached" -> "encroach", "refusing" -> "refuse"),
+    else the word itself"""
+    if word in LEGAL_VOCABULARY:
+        return word
+    for suffix in INFLECTION_SUFFIXES:
+        if not word.endswith(suffix) or len(word) - len(suffix) < 3:
+            continue
+        stem = word[:-len(suffix)]
+        if stem in LEGAL_VOCABULARY:
+            return stem
+        # "-ing" and "-ed" drop a silent e
+        if suffix in ("ing", "ed") and stem + "e" in LEGAL_VOCABULARY:
+            return stem + "e"
+    return word
+
+class LegalTextClassifier:
+    """Weighted keyword model deciding whether a case description is a legal matter.
+    
+    Scores are mapped to a probability with a logistic function; only descriptions whose
+    probability falls inside the (lower, upper) uncertainty band are left undecided. The bias
+    puts text with no legal evidence at all (sigmoid(-2.0) = 0.12) below the default lower
+    bound, so clearly off-topic requests are decided without Mistral.
+    """
+
+    def __init__(self, lower: float = 0.15, upper: float = 0.8, bias: float = -2.0):
+        self.lower = lower
+        self.upper = upper
+        self.bias = bias
+
+    def score(self, text: str) -> float:
+        """Probability that the text describes a legal matter"""
+        lowered = text.lower()
+        tokens = TOKEN_PATTERN.findall(lowered)
+        counts: Counter = Counter()
+        for n in range(1, MAX_PHRASE_WORDS + 1):
+            for i in range(len(tokens) - n + 1):
+                term = " ".join(tokens[i:i + n]) if n > 1 else base_form(tokens[i])
+                if term in LEGAL_VOCABULARY:
+                    counts[term] += 1
+
+        # Sublinear term frequency so one word repeated many times cannot dominate
+        total = self.bias
+        for term, count in counts.items():
+            total += LEGAL_VOCABULARY[term] * (1 + math.log(count))
+        for pattern, weight in STATUTE_PATTERNS:
+            if pattern.search(lowered):
+                total += weight
+        return 1 / (1 + math.exp(-total))
+
+    def decide(self, text: str) -> Optional[bool]:
+        """True/False for clear cases, None when the text falls in the uncertainty band"""
+        probability = self.score(text)
+        if probability >= self.upper:
+            return True
+        if probability <= self.lower:
+            return False
+        return None
+
+# The weights were tuned against the eval set; the held-out set was written separately and
+# is the one to quote accuracy from
+EVAL_SET_PATH = os.path.join(os.path.dirname(__file__), "data", "law_classifier_eval.jsonl")
+HOLDOUT_SET_PATH = os.path.join(os.path.dirname(__file__), "data", "law_classifier_holdout.jsonl")
+
+def load_eval_set(path: str = EVAL_SET_PATH) -> List[Tuple[str, bool]]:
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                examples.append((item["text"], bool(item["law_related"])))
+    return examples
+
+def evaluate(classifier: LegalTextClassifier, examples: List[Tuple[str, bool]]) -> Dict[str, float]:
+    """Measure how many examples are decided locally, how accurately, and how fast"""
+    decided = correct = 0
+    latencies = []
+    for text, label in examples:
+        start = time.perf_counter()
+        decision = classifier.decide(text)
+        latencies.append((time.perf_counter() - start) * 1e6)
+        if decision is not None:
+            decided += 1
+            correct += decision == label
+    latencies.sort()
+    return {
+        "examples": len(examples),
+        "coverage": decided / len(examples) if examples else 0.0,
+        "local_accuracy": correct / decided if decided else 0.0,
+        "llm_fallbacks": len(examples) - decided,
+        "mean_latency_us": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p95_latency_us": latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+    }
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Evaluate the local law-relatedness classifier")
+    parser.add_argument("--eval-set", default=HOLDOUT_SET_PATH)
+    parser.add_argument("--lower", type=float, default=0.15)
+    parser.add_argument("--upper", type=float, default=0.8)
+    args = parser.parse_args()
+
+    results = evaluate(LegalTextClassifier(lower=args.lower, upper=args.upper), load_eval_set(args.eval_set))
+    for name, value in results.items():
+        print(f"{name}: {value:.3f}" if isinstance(value, float) else f"{name}: {value}")
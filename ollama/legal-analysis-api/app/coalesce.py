@@ -0,0 +1,43 @@
+# coalesce.py
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+from pydantic import BaseModel
+from .metrics import registry
+
+T = TypeVar("T")
+
+coalesced_requests = registry.counter(
+    "analysis_coalesced_requests_total",
+    "Requests that joined an identical in-flight analysis instead of starting their own"
+)
+
+def canonical_key(model: BaseModel) -> str:
+    """Hash a request body so that formatting-only differences map to the same key"""
+    fields: Dict[str, Any] = {}
+    for name, value in model.dict().items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        fields[name] = value or None
+    payload = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SingleFlight(Generic[T]):
+    """Run at most one call per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self._in_flight: Dict[str, "asyncio.Task[T]"] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """Return the call's result and whether it was shared with an earlier caller"""
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            coalesced_requests.inc()
+        # Shielded so a disconnecting caller does not cancel the work the others are waiting on
+        return await asyncio.shield(task), shared
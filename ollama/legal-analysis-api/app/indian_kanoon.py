@@ -1,38 +1,268 @@
 # indian_kanoon.py
-import requests
-import os
-from typing import List, Dict, Any, Optional
+import asyncio
+import sqlite3
+import httpx
+from typing import List, Dict, Any, Optional, Set
+from .cache import SearchCache, DocumentCache
+from .precedent_index import PrecedentIndex, is_kanoon_doc_id
+from .metrics import registry, track
+
+request_seconds = registry.histogram(
+    "kanoon_request_duration_seconds",
+    "Wall-clock time of Indian Kanoon API calls, including the concurrency wait",
+    labelnames=("operation",)
+)
+requests_in_flight = registry.gauge(
+    "kanoon_requests_in_flight",
+    "Indian Kanoon API calls currently running or waiting",
+    labelnames=("operation",)
+)
+request_errors = registry.counter(
+    "kanoon_request_errors_total",
+    "Indian Kanoon API calls that failed",
+    labelnames=("operation",)
+)
+search_cache_lookups = registry.counter(
+    "kanoon_search_cache_lookups_total",
+    "Search cache lookups by outcome (fresh, stale, miss, stale_on_error)",
+    labelnames=("result",)
+)
+document_cache_lookups = registry.counter(
+    "kanoon_document_cache_lookups_total",
+    "Document cache lookups by outcome (hit, shared, miss)",
+    labelnames=("result",)
+)
+precedent_lookups = registry.counter(
+    "precedent_index_lookups_total",
+    "Local precedent index lookups by outcome (local, fallback)",
+    labelnames=("result",)
+)
+
+queries_per_search = registry.histogram(
+    "kanoon_queries_per_search",
+    "Ranked queries issued before a precedent search found enough matches (or ran out of queries)",
+    buckets=(1, 2, 3, 4, 5, 8)
+)
+matched_query_rank = registry.counter(
+    "kanoon_matched_query_rank_total",
+    "Precedent searches by the rank of the query that found enough matches (none if no query did)",
+    labelnames=("rank",)
+)
 
 class IndianKanoonClient:
-    def __init__(self, api_key: str):
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = "https://api.indiankanoon.org/search/",
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 20.0,
+        max_concurrency: int = 8,
+        search_cache: Optional[SearchCache] = None,
+        document_cache: Optional[DocumentCache] = None,
+        bulk_concurrency: int = 4,
+        precedent_index: Optional[PrecedentIndex] = None,
+        local_min_score: float = 0.5,
+    ):
         self.api_key = api_key
-        self.base_url = "https://api.indiankanoon.org/search/"
+        self.base_url = base_url
         self.headers = {
             "Authorization": f"Token {self.api_key}",
             "Content-Type": "application/json"
         }
-    
-    def search_cases(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
-        """Search for cases on Indian Kanoon based on query"""
-        try:
-            params = {
-                "query": query,
-                "max_results": max_results
-            }
-            response = requests.get(self.base_url, headers=self.headers, params=params)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=connect_timeout,
+            pool=connect_timeout,
+        )
+        # Caps in-flight Kanoon calls per worker so a slow upstream cannot pile up requests
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.search_cache = search_cache
+        self._refreshing: Set[str] = set()
+        self._background: Set[asyncio.Task] = set()
+        self.document_cache = document_cache
+        self.bulk_concurrency = bulk_concurrency
+        self._documents_in_flight: Dict[str, asyncio.Task] = {}
+        # Fetched judgments are added to the local index; its results are used when the
+        # best one reaches local_min_score (normalized BM25, 0-1)
+        self.precedent_index = precedent_index
+        self.local_min_score = local_min_score
+
+    async def start(self) -> None:
+        """Open the shared connection pool (called from the app lifespan)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=self.headers, limits=self.limits, timeout=self.timeout)
+
+    async def close(self) -> None:
+        """Close the shared connection pool"""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared AsyncClient, created on first use if the lifespan has not started it"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(headers=self.headers, limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def _get(self, url: str, operation: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        with track(request_seconds, requests_in_flight, request_errors, operation=operation):
+            async with self._semaphore:
+                response = await self.client.get(url, params=params)
             response.raise_for_status()
-            return response.json().get("docs", [])
-        except requests.RequestException as e:
+            return response.json()
+
+    async def _fetch_search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        params = {
+            "query": query,
+            "max_results": max_results
+        }
+        data = await self._get(self.base_url, "search", params=params)
+        docs = data.get("docs", [])
+        # Empty results are not cached so a later search can still find matches
+        if docs and self.search_cache is not None:
+            await self.search_cache.put(query, max_results, docs)
+        return docs
+
+    def _revalidate(self, query: str, max_results: int) -> None:
+        """Refresh a stale cache entry in the background, at most once per key at a time"""
+        key = SearchCache.make_key(query, max_results)
+        if key in self._refreshing:
+            return
+
+        async def refresh():
+            try:
+                await self._fetch_search(query, max_results)
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Error refreshing cached Indian Kanoon search: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        self._refreshing.add(key)
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def search_cases(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """Search for cases, answering from the local precedent index or the search cache when possible"""
+        if self.precedent_index is not None:
+            try:
+                local = await self.precedent_index.search(query, max_results)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error searching the local precedent index: {str(e)}")
+                local = []
+            if local and local[0]["score"] >= self.local_min_score:
+                precedent_lookups.labels(result="local").inc()
+                return local
+            precedent_lookups.labels(result="fallback").inc()
+        
+        cached = None
+        if self.search_cache is not None:
+            cached = await self.search_cache.get(query, max_results)
+            if cached is not None and cached.fresh:
+                search_cache_lookups.labels(result="fresh").inc()
+                return cached.docs
+            if cached is not None and cached.revalidate:
+                search_cache_lookups.labels(result="stale").inc()
+                self._revalidate(query, max_results)
+                return cached.docs
+            search_cache_lookups.labels(result="miss").inc()
+        try:
+            return await self._fetch_search(query, max_results)
+        except (httpx.HTTPError, ValueError) as e:
             print(f"Error searching Indian Kanoon: {str(e)}")
+            if cached is not None:
+                # A stale answer is more useful than "Unable to find similar cases"
+                search_cache_lookups.labels(result="stale_on_error").inc()
+                return cached.docs
             return []
+
+    async def search_ranked(
+        self,
+        queries: List[str],
+        max_results: int = 5,
+        min_results: int = 1
+    ) -> List[Dict[str, Any]]:
+        """Try queries from most to least specific, stopping at the first with `min_results` matches.
+        
+        If none has enough, the largest result set seen is returned.
+        """
+        best: List[Dict[str, Any]] = []
+        for rank, query in enumerate(queries, 1):
+            docs = await self.search_cases(query, max_results)
+            if len(docs) >= min_results:
+                queries_per_search.observe(rank)
+                matched_query_rank.labels(rank=rank).inc()
+                return docs
+            if len(docs) > len(best):
+                best = docs
+        queries_per_search.observe(len(queries))
+        matched_query_rank.labels(rank="none").inc()
+        return best
     
-    def get_case_details(self, doc_id: str) -> Optional[Dict[str, Any]]:
-        """Get details for a specific case"""
+    async def _fetch_case_details(self, doc_id: str) -> Optional[Dict[str, Any]]:
         try:
             url = f"{self.base_url}{doc_id}"
-            response = requests.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.json()
-        except requests.RequestException as e:
+            document = await self._get(url, "document")
+        except (httpx.HTTPError, ValueError) as e:
             print(f"Error getting case details: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+        if document and self.document_cache is not None:
+            self.document_cache.put(doc_id, document)
+        if document and self.precedent_index is not None:
+            try:
+                await self.precedent_index.add_kanoon_document(doc_id, document)
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error indexing case {doc_id}: {str(e)}")
+        return document
+
+    async def get_case_details(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        """Get details for a specific case, sharing one fetch between concurrent callers"""
+        if not is_kanoon_doc_id(doc_id):
+            # Judgments indexed from local files have nothing to fetch
+            return None
+        if self.document_cache is not None:
+            document = self.document_cache.get(doc_id)
+            if document is not None:
+                document_cache_lookups.labels(result="hit").inc()
+                return document
+        task = self._documents_in_flight.get(doc_id)
+        document_cache_lookups.labels(result="shared" if task is not None else "miss").inc()
+        if task is None:
+            task = asyncio.create_task(self._fetch_case_details(doc_id))
+            self._documents_in_flight[doc_id] = task
+            task.add_done_callback(lambda _: self._documents_in_flight.pop(doc_id, None))
+        # Shielded so one caller giving up does not cancel the fetch for the others
+        return await asyncio.shield(task)
+
+    async def get_many_case_details(
+        self,
+        doc_ids: List[str],
+        max_concurrency: Optional[int] = None
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Fetch several cases in parallel, at most `max_concurrency` at a time.
+        
+        Returns a dict in the order of the (deduplicated) ids; failed fetches map to None.
+        """
+        unique_ids = list(dict.fromkeys(str(doc_id) for doc_id in doc_ids))
+        semaphore = asyncio.Semaphore(max_concurrency or self.bulk_concurrency)
+
+        async def fetch(doc_id: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.get_case_details(doc_id)
+
+        documents = await asyncio.gather(*(fetch(doc_id) for doc_id in unique_ids))
+        return dict(zip(unique_ids, documents))
@@ -1,99 +1,617 @@
 # main.py
 import os
-from fastapi import FastAPI, HTTPException, Depends
+import json
+import time
+import asyncio
+import httpx
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from pydantic import ValidationError
 from dotenv import load_dotenv
-from .models import CaseInput, CaseAnalysis, CaseReference
+from .models import CaseInput, CaseAnalysis, CaseReference, FollowUpQuestion, FollowUpAnswer
 from .indian_kanoon import IndianKanoonClient
+from .cache import SearchCache, DocumentCache
+from .precedent_index import PrecedentIndex, IndexInUseError, is_kanoon_doc_id
 from .mistral import MistralClient
+from .backends import BackendPool
+from .classifier import LegalTextClassifier
+from .streaming import AnalysisStreamParser, sse_event
+from .timing import StageTimings
+from .coalesce import SingleFlight, canonical_key
+from .metrics import registry
+from .scheduler import PriorityScheduler
+from .admission import AdmissionController, AdmissionRejected
+from .semantic_cache import SemanticCache
+from .passages import PassageSelector
+from .query_builder import QueryBuilder
+from .sessions import AnalysisSession, SessionStore
+from .parsing import FALLBACK_ANALYSIS
 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, PlainTextResponse, JSONResponse
 
 from fastapi.middleware.cors import CORSMiddleware
 
+# Load environment variables
+load_dotenv()
+INDIAN_KANOON_API_KEY = os.getenv("INDIAN_KANOON_API_KEY")
+
+# One or more Ollama servers, comma-separated; generations go to the least loaded healthy one
+OLLAMA_BASE_URLS = [url.strip() for url in os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/api").split(",") if url.strip()]
+
+admission_controller = AdmissionController(
+    # Two concurrent generations per backend unless configured otherwise
+    max_concurrent=int(os.getenv("OLLAMA_MAX_CONCURRENT_GENERATIONS", str(2 * len(OLLAMA_BASE_URLS)))),
+    max_queue=int(os.getenv("OLLAMA_MAX_QUEUED_GENERATIONS", "16")),
+    queue_timeout=float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "30")),
+)
+
+mistral_client = MistralClient(
+    backends=BackendPool(
+        OLLAMA_BASE_URLS,
+        health_interval=float(os.getenv("OLLAMA_HEALTH_INTERVAL", "10")),
+        health_timeout=float(os.getenv("OLLAMA_HEALTH_TIMEOUT", "2")),
+    ),
+    model=os.getenv("OLLAMA_MODEL", "mistral:latest"),
+    max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "10")),
+    max_keepalive_connections=int(os.getenv("OLLAMA_MAX_KEEPALIVE_CONNECTIONS", "5")),
+    keepalive_expiry=float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "60")),
+    connect_timeout=float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("OLLAMA_READ_TIMEOUT", "300")),
+    classifier=LegalTextClassifier(
+        lower=float(os.getenv("LAW_CLASSIFIER_LOWER", "0.15")),
+        upper=float(os.getenv("LAW_CLASSIFIER_UPPER", "0.8")),
+    ) if os.getenv("LAW_CLASSIFIER_ENABLED", "true").lower() == "true" else None,
+    admission=admission_controller,
+    json_output=os.getenv("OLLAMA_JSON_OUTPUT", "true").lower() == "true",
+    max_parse_retries=int(os.getenv("ANALYSIS_PARSE_RETRIES", "1")),
+    keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+    options={
+        name: int(os.getenv(variable))
+        for name, variable in (("num_ctx", "OLLAMA_NUM_CTX"), ("num_thread", "OLLAMA_NUM_THREAD"))
+        if os.getenv(variable)
+    },
+    call_options=json.loads(os.getenv("OLLAMA_CALL_OPTIONS")) if os.getenv("OLLAMA_CALL_OPTIONS") else None,
+    embed_model=os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text"),
+    # e.g. {"classify": "qwen2.5:0.5b-instruct-q4_K_M"} to answer YES/NO checks with a small model
+    call_models=json.loads(os.getenv("OLLAMA_CALL_MODELS")) if os.getenv("OLLAMA_CALL_MODELS") else None,
+    escalate_unsure=os.getenv("OLLAMA_ESCALATE_UNSURE", "true").lower() == "true",
+)
+
+# Exact-match tier always; the semantic tier needs an embedding model (empty OLLAMA_EMBED_MODEL disables it)
+analysis_cache = SemanticCache(
+    embed=mistral_client.embed if mistral_client.embed_model else None,
+    capacity=int(os.getenv("ANALYSIS_CACHE_CAPACITY", "1000")),
+    threshold=float(os.getenv("ANALYSIS_CACHE_THRESHOLD", "0.95")),
+) if os.getenv("ANALYSIS_CACHE_ENABLED", "true").lower() == "true" else None
+
+KANOON_CACHE_PATH = os.getenv("KANOON_CACHE_PATH", ".cache/kanoon_search.sqlite3")
+PRECEDENT_INDEX_PATH = os.getenv("PRECEDENT_INDEX_PATH", ".cache/precedent_index")
+
+# Both are opened by the lifespan, so importing the app creates no files
+search_cache = SearchCache(
+    KANOON_CACHE_PATH,
+    ttl=float(os.getenv("KANOON_CACHE_TTL", "86400")),
+    stale_ttl=float(os.getenv("KANOON_CACHE_STALE_TTL", "604800")),
+    max_entries=int(os.getenv("KANOON_CACHE_MAX_ENTRIES", "5000")),
+) if KANOON_CACHE_PATH else None
+
+precedent_index = PrecedentIndex(
+    PRECEDENT_INDEX_PATH,
+    flush_every=int(os.getenv("PRECEDENT_INDEX_FLUSH_EVERY", "256")),
+) if PRECEDENT_INDEX_PATH else None
+
+kanoon_client = IndianKanoonClient(
+    api_key=INDIAN_KANOON_API_KEY,
+    base_url=os.getenv("INDIAN_KANOON_BASE_URL", "https://api.indiankanoon.org/search/"),
+    max_connections=int(os.getenv("KANOON_MAX_CONNECTIONS", "10")),
+    connect_timeout=float(os.getenv("KANOON_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("KANOON_READ_TIMEOUT", "20")),
+    max_concurrency=int(os.getenv("KANOON_MAX_CONCURRENCY", "8")),
+    search_cache=search_cache,
+    document_cache=DocumentCache(max_bytes=int(os.getenv("KANOON_DOCUMENT_CACHE_BYTES", str(64 * 1024 * 1024)))),
+    bulk_concurrency=int(os.getenv("KANOON_BULK_CONCURRENCY", "4")),
+    precedent_index=precedent_index,
+    local_min_score=float(os.getenv("PRECEDENT_INDEX_MIN_SCORE", "0.5")),
+)
+
+# Most relevant paragraphs of the top judgments go into the prompt instead of the search snippets.
+# The budget has to fit Ollama's context window (OLLAMA_NUM_CTX, 2048 by default) with the answer.
+passage_selector = PassageSelector(
+    token_budget=int(os.getenv("PASSAGE_TOKEN_BUDGET", "800")),
+    max_per_document=int(os.getenv("PASSAGE_MAX_PER_DOCUMENT", "3")),
+) if os.getenv("PASSAGE_SELECTION_ENABLED", "true").lower() == "true" else None
+PASSAGE_DOCUMENTS = int(os.getenv("PASSAGE_DOCUMENTS", "3"))
+PASSAGE_TIMEOUT = float(os.getenv("PASSAGE_TIMEOUT", "5"))
+
+query_builder = QueryBuilder(max_queries=int(os.getenv("SEARCH_MAX_QUERIES", "3")))
+SEARCH_MIN_RESULTS = int(os.getenv("SEARCH_MIN_RESULTS", "1"))
+
+# Ollama conversation context of recent analyses, so follow-up questions skip re-reading the prompt
+session_store = SessionStore(
+    max_sessions=int(os.getenv("SESSION_MAX", "1000")),
+    ttl=float(os.getenv("SESSION_TTL", "1800")),
+)
+
+batch_scheduler = PriorityScheduler(workers=int(os.getenv("BATCH_WORKERS", "2")))
+BATCH_MAX_CASES = int(os.getenv("BATCH_MAX_CASES", "500"))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared HTTP connection pools and on-disk caches on startup and close them on shutdown"""
+    await mistral_client.start()
+    preload = None
+    if os.getenv("OLLAMA_PRELOAD", "true").lower() == "true":
+        # Loaded in the background so the API accepts requests while the model warms up
+        preload = asyncio.create_task(mistral_client.preload())
+    if search_cache is not None:
+        await asyncio.to_thread(search_cache.open)
+    if precedent_index is not None:
+        try:
+            await asyncio.to_thread(precedent_index.open)
+        except IndexInUseError as e:
+            # e.g. several uvicorn workers: the first one owns the index, the others search Kanoon only
+            print(f"Error opening the precedent index, continuing without it: {str(e)}")
+            kanoon_client.precedent_index = None
+    await kanoon_client.start()
+    await batch_scheduler.start()
+    try:
+        yield
+    finally:
+        if preload is not None:
+            preload.cancel()
+        await batch_scheduler.close()
+        await kanoon_client.close()
+        if kanoon_client.precedent_index is not None:
+            # Judgments harvested since the last segment was written would otherwise be lost
+            await asyncio.to_thread(kanoon_client.precedent_index.close)
+        if search_cache is not None:
+            search_cache.close()
+        await mistral_client.close()
+
+app = FastAPI(title="Legal Case Analysis API", lifespan=lifespan)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins in development
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Coalesced", "Retry-After"],
 )
 
-# Mount static files directory
-app.mount("/static", StaticFiles(directory="static"), name="static")
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "Time until the response headers are sent, by route",
+    labelnames=("method", "route", "status")
+)
+http_requests_in_flight = registry.gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being handled"
+)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    http_requests_in_flight.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_requests_in_flight.dec()
+        route = request.scope.get("route")
+        http_request_seconds.labels(
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status
+        ).observe(time.perf_counter() - start)
+
+follow_up_prompt_eval_saved = registry.histogram(
+    "follow_up_prompt_eval_saved_seconds",
+    "Estimated prompt processing time follow-up questions saved by reusing the analysis context"
+)
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Mount static files directory (absent when the API is run headless, e.g. under the benchmarks)
+if os.path.isdir("static"):
+    app.mount("/static", StaticFiles(directory="static"), name="static")
 
 @app.get("/")
 async def read_index():
     return FileResponse("static/index.html")
 
-# Load environment variables
-load_dotenv()
-INDIAN_KANOON_API_KEY = os.getenv("INDIAN_KANOON_API_KEY")
-
-app = FastAPI(title="Legal Case Analysis API")
-mistral_client = MistralClient()
+analysis_flights: SingleFlight[Tuple[CaseAnalysis, StageTimings]] = SingleFlight()
 
 def get_kanoon_client():
-    return IndianKanoonClient(api_key=INDIAN_KANOON_API_KEY)
+    return kanoon_client
 
-@app.post("/analyze-case", response_model=CaseAnalysis)
-async def analyze_case(case_input: CaseInput, kanoon_client: IndianKanoonClient = Depends(get_kanoon_client)):
-    """Analyze a legal case using Mistral and Indian Kanoon"""
-    
-    # Check if the case is law-related
-    is_law_related = await mistral_client.is_law_related(case_input.description)
-    if not is_law_related:
-        return CaseAnalysis(
-            win_probability=0.0,
-            favorable_points=[],
-            unfavorable_points=[],
-            references=[],
-            legal_basis="",
-            is_law_related=False,
-            error_message="The provided case does not appear to be related to law or legal matters."
-        )
-    
-    # Construct search query
-    search_query = f"{case_input.case_type} {case_input.plaintiff} {case_input.defendant} {case_input.description[:100]}"
-    
-    # Search for similar cases
-    similar_cases = kanoon_client.search_cases(search_query)
-    
-    if not similar_cases:
-        return CaseAnalysis(
-            win_probability=0.0,
-            favorable_points=[],
-            unfavorable_points=[],
-            references=[],
-            legal_basis="No similar cases found in the Indian Kanoon database.",
-            is_law_related=True,
-            error_message="Unable to find similar cases to analyze. Please provide more specific legal details."
-        )
-    
-    # Analyze the case using Mistral
-    win_probability, favorable_points, unfavorable_points, legal_basis = await mistral_client.analyze_case(
-        case_input.dict(),
-        similar_cases
-    )
-    
-    # Create references
+def build_references(similar_cases: List[Dict[str, Any]]) -> List[CaseReference]:
     references = []
     for case in similar_cases:
         references.append(
             CaseReference(
                 title=case.get("title", "Untitled Case"),
-                link=f"https://indiankanoon.org/doc/{case.get('doc_id', '')}/",
+                # Judgments indexed from local files have no Kanoon page
+                link=f"https://indiankanoon.org/doc/{case.get('doc_id', '')}/" if is_kanoon_doc_id(case.get("doc_id", "")) else "",
                 relevance=case.get("score", 0.0)
             )
         )
-    
+    return references
+
+def not_law_related_analysis() -> CaseAnalysis:
     return CaseAnalysis(
+        win_probability=0.0,
+        favorable_points=[],
+        unfavorable_points=[],
+        references=[],
+        legal_basis="",
+        is_law_related=False,
+        error_message="The provided case does not appear to be related to law or legal matters."
+    )
+
+def no_similar_cases_analysis() -> CaseAnalysis:
+    return CaseAnalysis(
+        win_probability=0.0,
+        favorable_points=[],
+        unfavorable_points=[],
+        references=[],
+        legal_basis="No similar cases found in the Indian Kanoon database.",
+        is_law_related=True,
+        error_message="Unable to find similar cases to analyze. Please provide more specific legal details."
+    )
+
+async def classify_and_search(
+    case_input: CaseInput,
+    kanoon_client: IndianKanoonClient,
+    timings: StageTimings
+) -> Tuple[Optional[CaseAnalysis], List[Dict[str, Any]]]:
+    """Run the law-relatedness check and the precedent search concurrently.
+    
+    Whichever finishes first and settles the outcome (not law-related, or no similar cases)
+    cancels the other and its CaseAnalysis is returned; otherwise the similar cases are.
+    """
+    classify = asyncio.create_task(timings.track("classify", mistral_client.is_law_related(case_input.description)))
+    queries = query_builder.build(case_input)
+    search = asyncio.create_task(timings.track(
+        "search",
+        kanoon_client.search_ranked(queries, min_results=SEARCH_MIN_RESULTS)
+    ))
+    pending = {classify, search}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if classify in done and not classify.result():
+                return not_law_related_analysis(), []
+            if search in done and not search.result():
+                return no_similar_cases_analysis(), []
+        return None, search.result()
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+def case_text(case_input: CaseInput) -> str:
+    parts = [case_input.case_type, case_input.description, case_input.timeline, case_input.evidence, case_input.previous_legal_history]
+    return "\n".join(part for part in parts if part)
+
+async def select_passages(
+    case_input: CaseInput,
+    similar_cases: List[Dict[str, Any]],
+    kanoon_client: IndianKanoonClient
+) -> List[Dict[str, Any]]:
+    """Attach the most relevant paragraphs of the top judgments to the similar cases.
+    
+    The judgments are fetched concurrently; if they are not all back within PASSAGE_TIMEOUT
+    the prompt falls back to the search snippets.
+    """
+    top = [case for case in similar_cases[:PASSAGE_DOCUMENTS] if case.get("doc_id")]
+    if passage_selector is None or not top:
+        return similar_cases
+    try:
+        documents = await asyncio.wait_for(
+            kanoon_client.get_many_case_details([case["doc_id"] for case in top]),
+            PASSAGE_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        print(f"Error fetching precedent judgments: timed out after {PASSAGE_TIMEOUT}s")
+        return similar_cases
+    passages = await asyncio.to_thread(passage_selector.select, case_text(case_input), documents)
+    return [
+        {**case, "passages": passages[str(case.get("doc_id"))]} if str(case.get("doc_id")) in passages else case
+        for case in similar_cases
+    ]
+
+async def run_analysis(
+    case_input: CaseInput,
+    kanoon_client: IndianKanoonClient
+) -> Tuple[CaseAnalysis, StageTimings]:
+    """Run the full analysis pipeline for one case, answering from the analysis cache when it can"""
+    timings = StageTimings()
+    
+    lookup = None
+    if analysis_cache is not None:
+        lookup = await timings.track("cache", analysis_cache.lookup(case_input))
+        if lookup.analysis is not None:
+            # Each caller gets a session of its own; a paraphrased case gets none, since continuing
+            # the cached conversation would hand it another client's facts
+            session_id = session_store.add(lookup.session.copy()) if lookup.session is not None else None
+            return lookup.analysis.copy(update={"session_id": session_id}), timings
+    
+    # Cached answers are served even under overload; anything else is turned away before it searches
+    admission_controller.check()
+    
+    # Check if the case is law-related while searching for similar cases
+    early_result, similar_cases = await classify_and_search(case_input, kanoon_client, timings)
+    if early_result is not None:
+        return early_result, timings
+    similar_cases = await timings.track("passages", select_passages(case_input, similar_cases, kanoon_client))
+    
+    # Analyze the case using Mistral
+    done: Dict[str, Any] = {}
+    result = await timings.track(
+        "analyze",
+        mistral_client.analyze_case(case_input.dict(), similar_cases, done=done)
+    )
+    win_probability, favorable_points, unfavorable_points, legal_basis = result
+    session = AnalysisSession(done) if done.get("context") else None
+    
+    analysis = CaseAnalysis(
         win_probability=win_probability,
         favorable_points=favorable_points,
         unfavorable_points=unfavorable_points,
-        references=references,
+        references=build_references(similar_cases),
         legal_basis=legal_basis,
-        is_law_related=True
+        is_law_related=True,
+        session_id=session_store.add(session.copy()) if session is not None else None
+    )
+    # Unparseable answers are not worth repeating to the next caller
+    if lookup is not None and result != FALLBACK_ANALYSIS:
+        analysis_cache.store(lookup, analysis, session)
+    return analysis, timings
+
+@app.post("/analyze-case", response_model=CaseAnalysis)
+async def analyze_case(
+    case_input: CaseInput,
+    response: Response,
+    kanoon_client: IndianKanoonClient = Depends(get_kanoon_client)
+):
+    """Analyze a legal case using Mistral and Indian Kanoon.
+    
+    Identical concurrent submissions share one pipeline run (marked with X-Coalesced: true).
+    Repeated or paraphrased cases are answered from the analysis cache (marked with cached: true).
+    Per-stage timings are reported in the Server-Timing response header.
+    """
+    (analysis, timings), shared = await analysis_flights.do(
+        canonical_key(case_input),
+        lambda: run_analysis(case_input, kanoon_client)
+    )
+    response.headers["Server-Timing"] = timings.server_timing()
+    if shared:
+        response.headers["X-Coalesced"] = "true"
+    return analysis
+
+async def run_batch_analysis(
+    case_input: CaseInput,
+    kanoon_client: IndianKanoonClient
+) -> Tuple[CaseAnalysis, StageTimings]:
+    """Batch workers are already bounded, so they wait for admission instead of being rejected"""
+    with admission_controller.patient():
+        return await run_analysis(case_input, kanoon_client)
+
+async def read_batch_items(request: Request) -> AsyncIterator[Any]:
+    """Yield raw case objects from a JSON array (or {"cases": [...]}) or an NDJSON body.
+    
+    NDJSON bodies are parsed line by line as they are uploaded; a malformed line yields
+    the ValueError in its place so the caller can report it for that index.
+    """
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        yield e
+        if buffer.strip():
+            try:
+                yield json.loads(buffer)
+            except ValueError as e:
+                yield e
+        return
+    
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array of cases or NDJSON")
+    items = body.get("cases") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Request body must be a JSON array of cases or NDJSON")
+    for item in items:
+        yield item
+
+@app.post("/analyze-cases")
+async def analyze_cases(
+    request: Request,
+    priority: int = 0,
+    kanoon_client: IndianKanoonClient = Depends(get_kanoon_client)
+):
+    """Analyze a batch of cases through the shared worker pool.
+    
+    Accepts a JSON array of CaseInput objects or an NDJSON stream (Content-Type:
+    application/x-ndjson). Cases are queued as soon as they are read, batches with a
+    higher `priority` are scheduled first, and one NDJSON line per case is streamed back
+    as each analysis finishes: {"index", "analysis", "timings"} or {"index", "error"}.
+    """
+    results: asyncio.Queue = asyncio.Queue()
+    jobs: List[asyncio.Future] = []
+    
+    def report(index: int, future: asyncio.Future) -> None:
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            results.put_nowait({"index": index, "error": str(future.exception())})
+            return
+        analysis, timings = future.result()
+        results.put_nowait({"index": index, "analysis": analysis.dict(), "timings": timings.as_dict()})
+    
+    index = -1
+    async for item in read_batch_items(request):
+        index += 1
+        if index >= BATCH_MAX_CASES:
+            results.put_nowait({"index": index, "error": f"Batch is limited to {BATCH_MAX_CASES} cases"})
+            break
+        if isinstance(item, ValueError):
+            results.put_nowait({"index": index, "error": f"Invalid JSON: {str(item)}"})
+            continue
+        try:
+            case_input = CaseInput.parse_obj(item)
+        except ValidationError as e:
+            results.put_nowait({"index": index, "error": str(e)})
+            continue
+        job = batch_scheduler.submit(lambda case_input=case_input: run_batch_analysis(case_input, kanoon_client), priority)
+        job.add_done_callback(lambda future, index=index: report(index, future))
+        jobs.append(job)
+    # One line per item read (the last may be the limit error). Counting queued results instead
+    # would count a job that finished during the upload twice, once queued and once in jobs
+    total = index + 1
+    
+    async def lines() -> AsyncIterator[str]:
+        try:
+            for _ in range(total):
+                yield json.dumps(await results.get()) + "\n"
+        finally:
+            # The client went away: drop whatever is still queued or running
+            for job in jobs:
+                job.cancel()
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.post("/analyze-case/{session_id}/follow-up", response_model=FollowUpAnswer)
+async def follow_up(session_id: str, follow_up: FollowUpQuestion):
+    """Answer a follow-up question about an analyzed case.
+    
+    The question is sent with the Ollama context of the analysis (`session_id` from the
+    CaseAnalysis) to the backend that produced it, so the case, precedents and earlier answer
+    are not processed again. The answer carries a new session_id for further questions.
+    """
+    session = session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired session; please analyze the case again")
+    
+    prompt = mistral_client.build_follow_up_prompt(follow_up.question)
+    done: Dict[str, Any] = {}
+    try:
+        answer = await mistral_client.generate_response(
+            prompt,
+            call="follow_up",
+            context=session.context,
+            model=session.model,
+            backend=session.backend,
+            done=done
+        )
+    except httpx.HTTPError as e:
+        print(f"Error answering follow-up question: {str(e)}")
+        raise HTTPException(status_code=502, detail="The follow-up question could not be answered")
+    
+    # What resubmitting would have cost: the whole conversation so far (the case prompt, the
+    # answer and any earlier follow-ups, all in the context) plus the question. If Ollama had to
+    # re-read the context (no KV cache hit) its tokens are part of prompt_eval_count.
+    prompt_eval = done.get("prompt_eval_duration", 0) / 1e9
+    question_tokens = done.get("prompt_eval_count", 0)
+    if question_tokens >= len(session.context):
+        question_tokens -= len(session.context)
+    without_context = (len(session.context) + question_tokens) * session.prompt_eval_rate
+    saved = max(0.0, without_context - prompt_eval)
+    follow_up_prompt_eval_saved.observe(saved)
+    return FollowUpAnswer(
+        answer=answer.strip(),
+        session_id=session_store.create(done),
+        context_tokens=len(session.context),
+        prompt_eval_ms=round(prompt_eval * 1000, 1),
+        prompt_eval_saved_ms=round(saved * 1000, 1)
+    )
+
+@app.get("/metrics")
+async def metrics():
+    """Service metrics in the Prometheus text exposition format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/analyze-case/stream")
+async def analyze_case_stream(case_input: CaseInput, kanoon_client: IndianKanoonClient = Depends(get_kanoon_client)):
+    """Analyze a legal case, streaming the result as server-sent events while Mistral generates it.
+
+    Events: `references`, `probability`, `favorable_point`, `unfavorable_point`, `legal_basis`
+    (text deltas), `error`, `timings` (per-stage durations), and a final `done` carrying the
+    complete CaseAnalysis.
+    """
+    # Rejected with 429 before any event is sent, rather than after searching Kanoon
+    admission_controller.check()
+    
+    async def events() -> AsyncIterator[str]:
+        timings = StageTimings()
+        try:
+            early_result, similar_cases = await classify_and_search(case_input, kanoon_client, timings)
+        except AdmissionRejected as e:
+            yield sse_event("error", {"error_message": e.reason, "retry_after": e.retry_after})
+            return
+        if early_result is not None:
+            yield sse_event("timings", timings.as_dict())
+            yield sse_event("done", early_result.dict())
+            return
+        
+        references = build_references(similar_cases)
+        yield sse_event("references", [reference.dict() for reference in references])
+        similar_cases = await timings.track("passages", select_passages(case_input, similar_cases, kanoon_client))
+        
+        parser = AnalysisStreamParser()
+        prompt = mistral_client.build_analysis_prompt(case_input.dict(), similar_cases)
+        analyze_start = time.perf_counter()
+        done: Dict[str, Any] = {}
+        try:
+            async for token in mistral_client.stream_response(prompt, done=done):
+                for event, data in parser.feed(token):
+                    yield sse_event(event, data)
+        except AdmissionRejected as e:
+            yield sse_event("error", {"error_message": e.reason, "retry_after": e.retry_after})
+            return
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Error streaming analysis from Mistral: {str(e)}")
+            yield sse_event("error", {"error_message": "The analysis stream was interrupted."})
+        for event, data in parser.close():
+            yield sse_event(event, data)
+        timings.record("analyze", (time.perf_counter() - analyze_start) * 1000)
+        yield sse_event("timings", timings.as_dict())
+        
+        win_probability, favorable_points, unfavorable_points, legal_basis = parser.result()
+        analysis = CaseAnalysis(
+            win_probability=win_probability,
+            favorable_points=favorable_points,
+            unfavorable_points=unfavorable_points,
+            references=references,
+            legal_basis=legal_basis,
+            is_law_related=True,
+            session_id=session_store.create(done)
+        )
+        yield sse_event("done", analysis.dict())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 if __name__ == "__main__":
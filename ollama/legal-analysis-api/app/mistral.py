@@ -1,29 +1,330 @@
 # mistral.py
+import json
+import asyncio
 import httpx
-from typing import Dict, Any, List, Tuple
+from contextlib import nullcontext
+from typing import Dict, Any, List, Tuple, Optional, AsyncIterator, Sequence
+from .classifier import LegalTextClassifier
+from .admission import AdmissionController
+from .backends import BackendPool
+from .metrics import registry, track
+from .parsing import (
+    ANALYSIS_SCHEMA,
+    FALLBACK_ANALYSIS,
+    AnalysisResult,
+    parse_analysis_json,
+    parse_analysis_sections,
+)
+
+local_law_decisions = registry.counter(
+    "law_classifier_local_decisions_total",
+    "Law-relatedness checks decided by the local classifier"
+)
+llm_law_decisions = registry.counter(
+    "law_classifier_llm_fallbacks_total",
+    "Law-relatedness checks that fell in the uncertainty band and went to Mistral"
+)
+classify_escalations = registry.counter(
+    "law_classifier_escalations_total",
+    "LLM law-relatedness checks the small classification model could not answer, re-asked with the main model"
+)
+
+generation_seconds = registry.histogram(
+    "ollama_generation_duration_seconds",
+    "Wall-clock time of Ollama generations, including admission wait",
+    labelnames=("call",)
+)
+generations_in_flight = registry.gauge(
+    "ollama_generations_in_flight",
+    "Ollama generations currently running or waiting for admission",
+    labelnames=("call",)
+)
+generation_errors = registry.counter(
+    "ollama_generation_errors_total",
+    "Ollama generations that failed",
+    labelnames=("call",)
+)
+eval_tokens = registry.counter(
+    "ollama_eval_tokens_total",
+    "Tokens generated by Ollama (eval_count)",
+    labelnames=("call",)
+)
+prompt_eval_tokens = registry.counter(
+    "ollama_prompt_eval_tokens_total",
+    "Prompt tokens processed by Ollama (prompt_eval_count)",
+    labelnames=("call",)
+)
+eval_seconds = registry.histogram(
+    "ollama_eval_duration_seconds",
+    "Time Ollama spent generating tokens (eval_duration)",
+    labelnames=("call",)
+)
+prompt_eval_seconds = registry.histogram(
+    "ollama_prompt_eval_duration_seconds",
+    "Time Ollama spent processing the prompt (prompt_eval_duration)",
+    labelnames=("call",)
+)
+load_seconds = registry.histogram(
+    "ollama_load_duration_seconds",
+    "Time Ollama spent loading the model (load_duration)",
+    labelnames=("call",)
+)
+
+parse_outcomes = registry.counter(
+    "analysis_parse_outcomes_total",
+    "How analysis answers were parsed: clean, repaired (locally), sections (text fallback), retried or failed",
+    labelnames=("outcome",)
+)
+parse_retries = registry.counter(
+    "analysis_parse_retries_total",
+    "Extra generations spent asking Mistral to repair an unparseable analysis"
+)
+
+model_load_seconds = registry.histogram(
+    "ollama_model_load_seconds",
+    "Model load time reported by Ollama, split into cold loads and warm (already resident) hits",
+    labelnames=("state",)
+)
+
+# A load_duration above this means Ollama had to (re)load the model rather than reuse it
+COLD_LOAD_THRESHOLD = 1.0
+
+# Per-call generation options. num_ctx is deliberately left to DEFAULT_OPTIONS: Ollama reloads
+# the model whenever it changes between requests, which would cost far more than it saves.
+DEFAULT_CALL_OPTIONS: Dict[str, Dict[str, Any]] = {
+    "classify": {"num_predict": 4, "temperature": 0},
+    "classify_escalated": {"num_predict": 4, "temperature": 0},
+    "analyze": {"num_predict": 1024},
+    "stream": {"num_predict": 1024},
+    "repair": {"num_predict": 1024, "temperature": 0},
+    "follow_up": {"num_predict": 512},
+}
+
+def parse_yes_no(response: str) -> Optional[bool]:
+    """Read a YES/NO answer, tolerating case, punctuation and trailing words; None if it is neither"""
+    words = response.strip().upper().split()
+    answer = words[0].strip(".,!'\"*") if words else ""
+    if answer == "YES":
+        return True
+    if answer == "NO":
+        return False
+    return None
+
+def record_ollama_stats(call: str, body: Dict[str, Any]) -> None:
+    """Export the timing fields Ollama returns with a finished generation (durations are in ns)"""
+    if "eval_count" in body:
+        eval_tokens.labels(call=call).inc(body["eval_count"])
+    if "prompt_eval_count" in body:
+        prompt_eval_tokens.labels(call=call).inc(body["prompt_eval_count"])
+    if "eval_duration" in body:
+        eval_seconds.labels(call=call).observe(body["eval_duration"] / 1e9)
+    if "prompt_eval_duration" in body:
+        prompt_eval_seconds.labels(call=call).observe(body["prompt_eval_duration"] / 1e9)
+    if "load_duration" in body:
+        load_duration = body["load_duration"] / 1e9
+        load_seconds.labels(call=call).observe(load_duration)
+        state = "cold" if load_duration >= COLD_LOAD_THRESHOLD else "warm"
+        model_load_seconds.labels(state=state).observe(load_duration)
 
 class MistralClient:
-    def __init__(self):
-        self.base_url = "http://localhost:11434/api"
-        self.model = "mistral:latest"
+    def __init__(
+        self,
+        base_url: str = "http://localhost:11434/api",
+        backends: Optional[BackendPool] = None,
+        model: str = "mistral:latest",
+        max_connections: int = 10,
+        max_keepalive_connections: int = 5,
+        keepalive_expiry: float = 60.0,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 300.0,
+        classifier: Optional[LegalTextClassifier] = None,
+        admission: Optional[AdmissionController] = None,
+        json_output: bool = True,
+        max_parse_retries: int = 1,
+        keep_alive: str = "30m",
+        options: Optional[Dict[str, Any]] = None,
+        call_options: Optional[Dict[str, Dict[str, Any]]] = None,
+        embed_model: str = "nomic-embed-text",
+        call_models: Optional[Dict[str, str]] = None,
+        escalate_unsure: bool = True,
+    ):
+        # Generations go to the least loaded of several Ollama servers; a single base_url is a pool of one
+        self.backends = backends or BackendPool([base_url])
+        self.model = model
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # Generations on CPU can take minutes, so only the read phase gets a long timeout;
+        # waiting for a pooled connection is bounded by the connect timeout.
+        self.timeout = httpx.Timeout(
+            connect=connect_timeout,
+            read=read_timeout,
+            write=connect_timeout,
+            pool=connect_timeout,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.classifier = classifier
+        self.admission = admission
+        self.json_output = json_output
+        self.max_parse_retries = max_parse_retries
+        # How long Ollama keeps the model resident after a request (e.g. "30m", "-1" for forever)
+        self.keep_alive = keep_alive
+        # Options shared by every call (num_ctx, num_thread), overlaid by per-call-type options
+        self.options = options or {}
+        self.call_options = DEFAULT_CALL_OPTIONS if call_options is None else call_options
+        self.embed_model = embed_model
+        # Per-call-type models, e.g. a small quantized model for "classify"; others use `model`
+        self.call_models = call_models or {}
+        # Re-ask the main model when a smaller classification model gives no clear YES/NO
+        self.escalate_unsure = escalate_unsure
+    
+    async def start(self) -> None:
+        """Open the shared connection pool (called from the app lifespan)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        self.backends.start(self._client)
+    
+    async def close(self) -> None:
+        """Close the shared connection pool"""
+        await self.backends.close()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared AsyncClient, created on first use if the lifespan has not started it"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+    
+    def model_for(self, call: str) -> str:
+        """Ollama model used for a call type"""
+        return self.call_models.get(call, self.model)
+    
+    def options_for(self, call: str) -> Dict[str, Any]:
+        """Ollama `options` for a call type"""
+        return {**self.options, **self.call_options.get(call, {})}
+    
+    async def preload(self) -> None:
+        """Load every routed model into memory on every backend ahead of the first request and pin it for keep_alive"""
+        
+        async def preload_backend(url: str, model: str) -> None:
+            data = {"model": model, "keep_alive": self.keep_alive}
+            if self.options:
+                data["options"] = self.options
+            try:
+                response = await self.client.post(f"{url}/generate", json=data)
+                response.raise_for_status()
+                record_ollama_stats("preload", response.json())
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"Error preloading {model} on {url}: {str(e)}")
+        
+        models = dict.fromkeys([self.model, *self.call_models.values()])
+        await asyncio.gather(*(
+            preload_backend(backend.url, model) for backend in self.backends.backends for model in models
+        ))
+    
+    def _generation_slot(self):
+        """Admission slot held for the length of one generation"""
+        return self.admission.slot() if self.admission is not None else nullcontext()
     
-    async def generate_response(self, prompt: str) -> str:
-        """Generate a response from Mistral"""
-        url = f"{self.base_url}/generate"
+    async def generate_response(
+        self,
+        prompt: str,
+        call: str = "generate",
+        format: Optional[Any] = None,
+        context: Optional[Sequence[int]] = None,
+        model: Optional[str] = None,
+        backend: Optional[str] = None,
+        done: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Generate a response from Mistral; `call` labels the generation in metrics and
+        `format` ("json" or a JSON schema) constrains the output.
         
+        `context` continues an earlier conversation (preferably on the `backend` that produced
+        it, with the same `model`); `done` is filled with Ollama's final body, including the
+        new context, and the backend that served it.
+        """
         data = {
-            "model": self.model,
+            "model": model or self.model_for(call),
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            "options": self.options_for(call)
         }
+        if format is not None:
+            data["format"] = format
+        if context:
+            data["context"] = list(context)
+        
+        with track(generation_seconds, generations_in_flight, generation_errors, call=call):
+            async with self._generation_slot():
+                response = await self.backends.request(self.client, "POST", "generate", prefer=backend, json=data)
+            response.raise_for_status()
+            body = response.json()
+        record_ollama_stats(call, body)
+        if done is not None:
+            done.update(body, model=data["model"], backend=self.backends.backend_for(str(response.request.url)))
+        return body.get("response", "")
+    
+    async def stream_response(
+        self,
+        prompt: str,
+        call: str = "stream",
+        done: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """Yield response tokens from Mistral as Ollama streams them; `done` is filled as in generate_response"""
+        data = {
+            "model": self.model_for(call),
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive,
+            "options": self.options_for(call)
+        }
+        
+        with track(generation_seconds, generations_in_flight, generation_errors, call=call):
+            async with self._generation_slot():
+                async with self.backends.stream(self.client, "POST", "generate", json=data) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.strip():
+                            continue
+                        chunk = json.loads(line)
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            record_ollama_stats(call, chunk)
+                            if done is not None:
+                                done.update(
+                                    chunk,
+                                    model=data["model"],
+                                    backend=self.backends.backend_for(str(response.request.url))
+                                )
+                            break
+    
+    async def embed(self, text: str) -> List[float]:
+        """Embed text with the local embedding model (Ollama /api/embed)"""
+        data = {"model": self.embed_model, "input": text, "keep_alive": self.keep_alive}
         
-        async with httpx.AsyncClient() as client:
-            response = await client.post(url, json=data)
+        # Embeddings are cheap next to generations and use their own model, so they skip admission
+        with track(generation_seconds, generations_in_flight, generation_errors, call="embed"):
+            response = await self.backends.request(self.client, "POST", "embed", json=data)
             response.raise_for_status()
-            return response.json().get("response", "")
+            body = response.json()
+        return body["embeddings"][0]
     
     async def is_law_related(self, case_description: str) -> bool:
-        """Check if the case is related to law"""
+        """Check if the case is related to law, asking Mistral only when the local classifier is unsure"""
+        if self.classifier is not None:
+            decision = self.classifier.decide(case_description)
+            if decision is not None:
+                local_law_decisions.inc()
+                return decision
+            llm_law_decisions.inc()
+        
         prompt = f"""
         Determine if the following case description is related to law or legal matters.
         Return only 'YES' if it is related to law, or 'NO' if it is not.
@@ -31,19 +332,71 @@ class MistralClient:
         Case description: {case_description}
         """
         
-        response = await self.generate_response(prompt)
-        return response.strip().upper() == "YES"
+        can_escalate = self.escalate_unsure and self.model_for("classify") != self.model
+        try:
+            answer = parse_yes_no(await self.generate_response(prompt, call="classify"))
+        except httpx.HTTPStatusError as e:
+            # e.g. the small model is not pulled on this backend
+            if not can_escalate:
+                raise
+            print(f"Error classifying with {self.model_for('classify')}: {str(e)}")
+            answer = None
+        if answer is None and can_escalate:
+            classify_escalations.inc()
+            answer = parse_yes_no(await self.generate_response(prompt, call="classify_escalated"))
+        return bool(answer)
     
-    async def analyze_case(self, case_data: Dict[str, Any], similar_cases: List[Dict[str, Any]]) -> Tuple[float, List[str], List[str], str]:
-        """Analyze the case using similar cases from Indian Kanoon"""
+    def build_analysis_prompt(
+        self,
+        case_data: Dict[str, Any],
+        similar_cases: List[Dict[str, Any]],
+        json_output: bool = False
+    ) -> str:
+        """Build the analysis prompt from the case details and similar cases.
+        
+        The streaming endpoint needs the line-oriented section format; `json_output` asks for
+        a JSON object matching ANALYSIS_SCHEMA instead.
+        """
         
         # Prepare context from similar cases
         case_contexts = []
         for i, case in enumerate(similar_cases[:3]):  # Use top 3 cases
-            case_contexts.append(f"Case {i+1}: {case.get('title', 'Unknown')} - {case.get('snippet', 'No details available')}")
+            if case.get("passages"):
+                # Paragraphs picked from the full judgment (see passages.py)
+                excerpts = "\n".join(f"- {passage}" for passage in case["passages"])
+                case_contexts.append(f"Case {i+1}: {case.get('title', 'Unknown')}\nRelevant passages:\n{excerpts}")
+            else:
+                case_contexts.append(f"Case {i+1}: {case.get('title', 'Unknown')} - {case.get('snippet', 'No details available')}")
         
         case_context_str = "\n\n".join(case_contexts)
         
+        if json_output:
+            response_format = """
+        Respond with only a JSON object with these fields:
+        "win_probability": number between 0 and 100,
+        "favorable_points": list of strings,
+        "unfavorable_points": list of strings,
+        "legal_basis": string with a detailed explanation
+        """
+        else:
+            response_format = """
+        Format your response as follows:
+        WIN_PROBABILITY: [percentage]
+        
+        FAVORABLE_POINTS:
+        - [point 1]
+        - [point 2]
+        ...
+        
+        UNFAVORABLE_POINTS:
+        - [point 1]
+        - [point 2]
+        ...
+        
+        LEGAL_BASIS:
+        [detailed explanation]
+        """
+        
         # Prepare the prompt
         prompt = f"""
         Based on the following case details and similar cases, analyze the legal situation and provide:
@@ -61,47 +414,68 @@ class MistralClient:
         
         Similar cases from Indian Kanoon:
         {case_context_str}
+        {response_format}"""
+        return prompt
+    
+    def parse_analysis(self, response: str) -> Tuple[Optional[AnalysisResult], str]:
+        """Parse an analysis answer in a single pass, returning the result and how it was parsed"""
+        # Repair answers are always JSON, so JSON is tried even when json_output is off
+        result, repaired = parse_analysis_json(response)
+        if result is not None:
+            return result, "repaired" if repaired else "clean"
+        # The model may have ignored the format and answered in the section layout
+        result = parse_analysis_sections(response)
+        if result is not None:
+            return result, "sections" if self.json_output else "clean"
+        return None, "failed"
+    
+    def build_follow_up_prompt(self, question: str) -> str:
+        """Follow-up question, sent with the context of the analysis it refers to"""
+        return f"""
+        The client has a follow-up question about the case you analyzed above.
+        Answer it directly in a few paragraphs, referring to the case facts, the similar cases and
+        your earlier analysis, and say how the answer changes the win probability if it does.
         
-        Format your response as follows:
-        WIN_PROBABILITY: [percentage]
-        
-        FAVORABLE_POINTS:
-        - [point 1]
-        - [point 2]
-        ...
-        
-        UNFAVORABLE_POINTS:
-        - [point 1]
-        - [point 2]
-        ...
+        Question: {question}
+        """
+    
+    def build_repair_prompt(self, response: str) -> str:
+        """Ask Mistral to restate an unparseable answer in the expected format"""
+        return f"""
+        The following legal analysis could not be read because it is not in the required format.
+        Rewrite it as a JSON object with the fields "win_probability" (number between 0 and 100),
+        "favorable_points" (list of strings), "unfavorable_points" (list of strings) and
+        "legal_basis" (string). Keep the content; respond with only the JSON object.
         
-        LEGAL_BASIS:
-        [detailed explanation]
+        Analysis:
+        {response[:4000]}
         """
+    
+    async def analyze_case(
+        self,
+        case_data: Dict[str, Any],
+        similar_cases: List[Dict[str, Any]],
+        done: Optional[Dict[str, Any]] = None
+    ) -> AnalysisResult:
+        """Analyze the case using similar cases from Indian Kanoon; `done` receives the body of
+        the analysis generation (see generate_response) so follow-ups can continue from its
+        context. Repair generations never touch it: their context holds the repair prompt, not the case."""
+        format = ANALYSIS_SCHEMA if self.json_output else None
+        prompt = self.build_analysis_prompt(case_data, similar_cases, json_output=self.json_output)
+        response = await self.generate_response(prompt, call="analyze", format=format, done=done)
         
-        response = await self.generate_response(prompt)
+        # Parse response, spending at most max_parse_retries extra generations on repairs
+        for attempt in range(self.max_parse_retries + 1):
+            result, outcome = self.parse_analysis(response)
+            if result is not None:
+                parse_outcomes.labels(outcome="retried" if attempt else outcome).inc()
+                return result
+            if attempt < self.max_parse_retries:
+                parse_retries.inc()
+                response = await self.generate_response(
+                    self.build_repair_prompt(response), call="repair", format=ANALYSIS_SCHEMA
+                )
         
-        # Parse response
-        try:
-            sections = response.split("\n\n")
-            win_probability = float(sections[0].split(":")[1].strip().replace("%", "")) / 100
-            
-            favorable_points = []
-            unfavorable_points = []
-            legal_basis = ""
-            
-            for section in sections:
-                if section.startswith("FAVORABLE_POINTS:"):
-                    points = section.split("\n")[1:]
-                    favorable_points = [p.strip("- ").strip() for p in points if p.strip()]
-                elif section.startswith("UNFAVORABLE_POINTS:"):
-                    points = section.split("\n")[1:]
-                    unfavorable_points = [p.strip("- ").strip() for p in points if p.strip()]
-                elif section.startswith("LEGAL_BASIS:"):
-                    legal_basis = "\n".join(section.split("\n")[1:])
-            
-            return win_probability, favorable_points, unfavorable_points, legal_basis
-            
-        except (IndexError, ValueError):
-            # Fallback if parsing fails
-            return 0.5, ["Could not determine"], ["Could not determine"], "Analysis incomplete due to formatting issues"
\ No newline at end of file
+        # Fallback if parsing fails
+        parse_outcomes.labels(outcome="failed").inc()
+        return FALLBACK_ANALYSIS
@@ -25,4 +25,17 @@ class CaseAnalysis(BaseModel):
     references: List[CaseReference]
     legal_basis: str
     is_law_related: bool = True
-    error_message: Optional[str] = None
\ No newline at end of file
+    error_message: Optional[str] = None
+    cached: bool = False
+    cache_similarity: Optional[float] = None
+    session_id: Optional[str] = None
+
+class FollowUpQuestion(BaseModel):
+    question: str
+
+class FollowUpAnswer(BaseModel):
+    answer: str
+    session_id: Optional[str] = None
+    context_tokens: int
+    prompt_eval_ms: float
+    prompt_eval_saved_ms: float
\ No newline at end of file
@@ -0,0 +1,106 @@
+# parsing.py
+import json
+import re
+from typing import Any, List, Optional, Tuple
+from .streaming import AnalysisStreamParser
+
+AnalysisResult = Tuple[float, List[str], List[str], str]
+
+FALLBACK_ANALYSIS: AnalysisResult = (
+    0.5, ["Could not determine"], ["Could not determine"], "Analysis incomplete due to formatting issues"
+)
+
+# JSON schema passed to Ollama's `format` so generation is constrained to the CaseAnalysis fields
+ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "win_probability": {"type": "number", "minimum": 0, "maximum": 100},
+        "favorable_points": {"type": "array", "items": {"type": "string"}},
+        "unfavorable_points": {"type": "array", "items": {"type": "string"}},
+        "legal_basis": {"type": "string"},
+    },
+    "required": ["win_probability", "favorable_points", "unfavorable_points", "legal_basis"],
+}
+
+def _probability(value: Any) -> Optional[float]:
+    """Read a win probability on the schema's 0-100 scale and return a fraction in [0, 1].
+
+    65, "65" and "65%" are 65%; "1%" and 1 are 1%. Only a non-integer below 1 without a percent
+    sign (0.65) is taken as a fraction, since models sometimes answer that way.
+    """
+    percent = False
+    if isinstance(value, str):
+        match = re.search(r"\d+(?:\.\d+)?", value)
+        if not match:
+            return None
+        percent = "%" in value[match.end():]
+        value = float(match.group())
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    value = float(value)
+    if percent or value >= 1 or value.is_integer():
+        value /= 100
+    return min(max(value, 0.0), 1.0)
+
+def _points(value: Any) -> List[str]:
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, list):
+        return []
+    points = []
+    for item in value:
+        text = str(item).strip().lstrip("-*• ").strip()
+        if text:
+            points.append(text)
+    return points
+
+def _first_json_object(text: str) -> Optional[dict]:
+    """Decode the first JSON object in the text, skipping any prose or code fences around it"""
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(text, start)
+            if isinstance(value, dict):
+                return value
+        except ValueError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+def parse_analysis_json(text: str) -> Tuple[Optional[AnalysisResult], bool]:
+    """Parse a JSON analysis, tolerating surrounding text and loosely typed fields.
+
+    Returns the analysis (or None) and whether anything had to be repaired to read it.
+    """
+    repaired = False
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = _first_json_object(text)
+        repaired = True
+    if not isinstance(data, dict):
+        return None, repaired
+
+    # Field names are matched case-insensitively so WIN_PROBABILITY or winProbability still count
+    fields = {re.sub(r"[^a-z]", "", key.lower()): value for key, value in data.items()}
+    win_probability = _probability(fields.get("winprobability"))
+    if win_probability is None:
+        return None, repaired
+    favorable_points = _points(fields.get("favorablepoints"))
+    unfavorable_points = _points(fields.get("unfavorablepoints"))
+    legal_basis = fields.get("legalbasis", "")
+    if not isinstance(legal_basis, str):
+        legal_basis = json.dumps(legal_basis)
+        repaired = True
+    repaired = repaired or not isinstance(data.get("win_probability"), (int, float))
+    return (win_probability, favorable_points, unfavorable_points, legal_basis.strip()), repaired
+
+def parse_analysis_sections(text: str) -> Optional[AnalysisResult]:
+    """Parse the WIN_PROBABILITY/FAVORABLE_POINTS/UNFAVORABLE_POINTS/LEGAL_BASIS text format"""
+    parser = AnalysisStreamParser()
+    parser.feed(text)
+    parser.close()
+    if parser.win_probability is None:
+        return None
+    return parser.result()
@@ -0,0 +1,84 @@
+# passages.py
+import html
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from .precedent_index import TAG_PATTERN, tokenize
+
+# Kanoon judgments are HTML; paragraphs end at </p>, <br>, block-level closes or blank lines
+PARAGRAPH_BREAK = re.compile(r"</p\s*>|<br\s*/?>|</(?:div|blockquote|pre|li)\s*>|\n\s*\n", re.IGNORECASE)
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English prose (about four characters per token)"""
+    return len(text) // 4 + 1
+
+def split_paragraphs(document: str, min_chars: int = 80, max_chars: int = 1200) -> List[str]:
+    """Split a judgment into plain-text paragraphs, dropping headers and other fragments"""
+    paragraphs = []
+    for block in PARAGRAPH_BREAK.split(document):
+        text = " ".join(html.unescape(TAG_PATTERN.sub(" ", block)).split())
+        if len(text) < min_chars:
+            continue
+        if len(text) > max_chars:
+            text = text[:max_chars].rsplit(" ", 1)[0] + " ..."
+        paragraphs.append(text)
+    return paragraphs
+
+class PassageSelector:
+    """Picks the paragraphs of the precedent judgments most relevant to a case.
+
+    Paragraphs from all documents are scored together with BM25 against the case text and
+    packed greedily into `token_budget`, at most `max_per_document` from any one judgment.
+    """
+
+    def __init__(self, token_budget: int = 800, max_per_document: int = 3, k1: float = 1.2, b: float = 0.75):
+        self.token_budget = token_budget
+        self.max_per_document = max_per_document
+        self.k1 = k1
+        self.b = b
+
+    def score(self, query: str, paragraphs: List[List[str]]) -> List[float]:
+        """BM25 score of each tokenized paragraph, using the paragraphs themselves as the corpus"""
+        terms = set(tokenize(query))
+        if not paragraphs or not terms:
+            return [0.0] * len(paragraphs)
+        document_frequency = Counter(term for tokens in paragraphs for term in set(tokens) & terms)
+        average_length = sum(len(tokens) for tokens in paragraphs) / len(paragraphs) or 1.0
+        count = len(paragraphs)
+        idf = {
+            term: math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for term, frequency in document_frequency.items()
+        }
+        scores = []
+        for tokens in paragraphs:
+            frequencies = Counter(token for token in tokens if token in idf)
+            norm = self.k1 * (1 - self.b + self.b * len(tokens) / average_length)
+            scores.append(sum(
+                idf[term] * tf * (self.k1 + 1) / (tf + norm) for term, tf in frequencies.items()
+            ))
+        return scores
+
+    def select(self, query: str, documents: Dict[str, Optional[Dict[str, Any]]]) -> Dict[str, List[str]]:
+        """Map each doc id to its selected passages, in the order they appear in the judgment"""
+        candidates: List[Tuple[str, int, str]] = []
+        for doc_id, document in documents.items():
+            if not document:
+                continue
+            for position, paragraph in enumerate(split_paragraphs(document.get("doc") or "")):
+                candidates.append((doc_id, position, paragraph))
+        scores = self.score(query, [tokenize(paragraph) for _, _, paragraph in candidates])
+
+        selected: Dict[str, List[Tuple[int, str]]] = {}
+        remaining = self.token_budget
+        ranked = sorted(zip(scores, candidates), key=lambda item: item[0], reverse=True)
+        for score, (doc_id, position, paragraph) in ranked:
+            if score <= 0:
+                break
+            cost = estimate_tokens(paragraph)
+            chosen = selected.setdefault(doc_id, [])
+            if cost > remaining or len(chosen) >= self.max_per_document:
+                continue
+            chosen.append((position, paragraph))
+            remaining -= cost
+        return {doc_id: [paragraph for _, paragraph in sorted(chosen)] for doc_id, chosen in selected.items()}
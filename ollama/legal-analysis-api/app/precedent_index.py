@@ -0,0 +1,428 @@
+# precedent_index.py
+"""On-disk BM25 index of harvested judgments, queried before the Indian Kanoon search API.
+
+Layout of an index directory:
+
+    index.sqlite3       documents (doc_id, title, snippet), term dictionary, segments, totals
+    lengths.bin         uint32 token count per document, indexed by document number
+    segment-N.postings  uint32 (document number, term frequency) pairs, grouped by term
+
+Documents are buffered and written as a new immutable segment every `flush_every`
+additions, so the index grows incrementally; `compact()` merges the segments into one.
+Postings and lengths are memory-mapped, so only the pages a query touches are read.
+
+An index directory belongs to one process at a time (document numbers and segment ids are
+allocated in memory); opening it while another process holds it raises IndexInUseError.
+Documents indexed from files have doc ids starting with `file:`, which are not Kanoon ids.
+
+Build or query an index from the command line (run from ollama/legal-analysis-api):
+
+    python -m app.precedent_index build .cache/precedent_index judgments/ --compact
+    python -m app.precedent_index search .cache/precedent_index "eviction without notice"
+"""
+import array
+import asyncio
+import heapq
+import html
+import math
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: the single-process rule is not enforced
+    fcntl = None
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+STOPWORDS = frozenset(
+    "a an and are as at be been by for from had has have he her his in is it its of on or "
+    "she that the their there this to was were which with".split()
+)
+
+# Prefix of the doc ids of judgments indexed from local files rather than fetched from Kanoon
+LOCAL_DOC_PREFIX = "file:"
+
+class IndexInUseError(RuntimeError):
+    """The index directory is open in another process"""
+
+def is_kanoon_doc_id(doc_id: Any) -> bool:
+    """Whether a doc id can be fetched from (and linked to) Indian Kanoon"""
+    return not str(doc_id).startswith(LOCAL_DOC_PREFIX)
+
+def tokenize(text: str) -> List[str]:
+    return [
+        token for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS and (len(token) > 1 or token.isdigit())
+    ]
+
+def document_text(document: Dict[str, Any]) -> str:
+    """Plain text of a Kanoon document (its `doc` field is HTML)"""
+    return html.unescape(TAG_PATTERN.sub(" ", document.get("doc") or ""))
+
+class PrecedentIndex:
+    """BM25 index over judgments stored in memory-mapped segment files"""
+
+    def __init__(
+        self,
+        path: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        flush_every: int = 256,
+        max_df_ratio: float = 0.5,
+        snippet_chars: int = 300,
+    ):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.flush_every = flush_every
+        # Terms in more than this share of documents carry almost no weight but have the
+        # longest postings lists, so they are skipped once the corpus is large enough
+        self.max_df_ratio = max_df_ratio
+        self.snippet_chars = snippet_chars
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock_file = None
+        self._pending: List[Tuple[str, str, str, int, Counter]] = []
+        self._pending_ids = set()
+        self.doc_count = 0
+        self.total_length = 0
+        self._lengths: memoryview = memoryview(array.array("I"))
+        self._segments: Dict[int, memoryview] = {}
+
+    def _open(self) -> None:
+        """Open the index files, creating them if needed (called with the lock held)"""
+        if self._conn is not None:
+            return
+        path = self.path
+        os.makedirs(path, exist_ok=True)
+        lock_file = open(os.path.join(path, "index.lock"), "w")
+        if fcntl is not None:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                raise IndexInUseError(f"Precedent index {path} is open in another process")
+        self._lock_file = lock_file
+        self._conn = sqlite3.connect(os.path.join(path, "index.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """CREATE TABLE IF NOT EXISTS documents (
+                num INTEGER PRIMARY KEY,
+                doc_id TEXT NOT NULL UNIQUE,
+                title TEXT NOT NULL,
+                snippet TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT NOT NULL,
+                segment INTEGER NOT NULL,
+                offset INTEGER NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (term, segment)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY, docs INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"""
+        )
+        self._conn.commit()
+        self.doc_count = self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'total_length'").fetchone()
+        self.total_length = row[0] if row else 0
+        # Lengths written by a flush that never committed are dropped
+        lengths_path = os.path.join(path, "lengths.bin")
+        with open(lengths_path, "ab") as f:
+            f.truncate(self.doc_count * 4)
+        self._lengths = self._map(lengths_path)
+        self._segments = {
+            segment: self._map(self._segment_path(segment))
+            for segment, in self._conn.execute("SELECT id FROM segments")
+        }
+
+    def open(self) -> None:
+        """Open the index (called from the app lifespan; otherwise it is opened on first use)"""
+        with self._lock:
+            self._open()
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"segment-{segment}.postings")
+
+    @staticmethod
+    def _map(path: str) -> memoryview:
+        """Memory-map a file of uint32 values (empty files cannot be mapped)"""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return memoryview(array.array("I"))
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast("I")
+
+    def _add(self, doc_id: str, title: str, text: str, snippet: Optional[str]) -> bool:
+        tokens = tokenize(f"{title}\n{text}")
+        if not tokens:
+            return False
+        snippet = snippet or " ".join(text.split())[:self.snippet_chars]
+        with self._lock:
+            self._open()
+            if doc_id in self._pending_ids or self._conn.execute(
+                "SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)
+            ).fetchone():
+                return False
+            self._pending.append((doc_id, title, snippet, len(tokens), Counter(tokens)))
+            self._pending_ids.add(doc_id)
+            if len(self._pending) >= self.flush_every:
+                self._flush()
+        return True
+
+    def _flush(self) -> None:
+        """Write the pending documents as a new segment (called with the lock held)"""
+        if not self._pending:
+            return
+        pending = self._pending
+        base = self.doc_count
+        postings: Dict[str, array.array] = defaultdict(lambda: array.array("I"))
+        lengths = array.array("I")
+        documents = []
+        for i, (doc_id, title, snippet, length, counts) in enumerate(pending):
+            for term, frequency in counts.items():
+                postings[term].extend((base + i, frequency))
+            lengths.append(length)
+            documents.append((base + i, doc_id, title, snippet))
+
+        segment = (self._conn.execute("SELECT MAX(id) FROM segments").fetchone()[0] or 0) + 1
+        segment_path = self._segment_path(segment)
+        lengths_path = os.path.join(self.path, "lengths.bin")
+        total_length = self.total_length + sum(lengths)
+        try:
+            terms = []
+            offset = 0
+            with open(segment_path, "wb") as f:
+                for term in sorted(postings):
+                    postings[term].tofile(f)
+                    count = len(postings[term]) // 2
+                    terms.append((term, segment, offset, count))
+                    offset += count
+            with open(lengths_path, "ab") as f:
+                lengths.tofile(f)
+
+            self._conn.executemany("INSERT INTO documents (num, doc_id, title, snippet) VALUES (?, ?, ?, ?)", documents)
+            self._conn.executemany("INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)", terms)
+            self._conn.execute("INSERT INTO segments (id, docs) VALUES (?, ?)", (segment, len(documents)))
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('total_length', ?)", (total_length,))
+            self._conn.commit()
+        except BaseException:
+            # Leave the index as it was, with the documents still pending for the next flush
+            self._conn.rollback()
+            with open(lengths_path, "ab") as f:
+                f.truncate(self.doc_count * 4)
+            try:
+                os.remove(segment_path)
+            except OSError:
+                pass
+            raise
+        self._pending, self._pending_ids = [], set()
+        self.doc_count += len(documents)
+        self.total_length = total_length
+        # Running searches keep their references to the old maps, which close once released
+        self._lengths = self._map(lengths_path)
+        self._segments[segment] = self._map(self._segment_path(segment))
+
+    def flush_now(self) -> None:
+        with self._lock:
+            self._open()
+            self._flush()
+
+    def compact(self) -> None:
+        """Merge all segments into one so each term's postings are read in a single run"""
+        with self._lock:
+            self._open()
+            self._flush()
+            if len(self._segments) <= 1:
+                return
+            old_segments = dict(self._segments)
+            segment = max(old_segments) + 1
+            # Read the term dictionary through a second connection while the main one rewrites it
+            reader = sqlite3.connect(os.path.join(self.path, "index.sqlite3"))
+            try:
+                rows = reader.execute("SELECT term, segment, offset, count FROM terms ORDER BY term, segment")
+                batch = []
+                offset = 0
+                current, start = None, 0
+                with open(self._segment_path(segment), "wb") as f:
+                    for term, old_segment, old_offset, count in rows:
+                        if term != current:
+                            if current is not None:
+                                batch.append((current, segment, start, offset - start))
+                            current, start = term, offset
+                        # Segments hold increasing document numbers, so postings stay sorted
+                        f.write(old_segments[old_segment][old_offset * 2:(old_offset + count) * 2].tobytes())
+                        offset += count
+                        if len(batch) >= 10000:
+                            self._conn.executemany("INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)", batch)
+                            batch = []
+                    if current is not None:
+                        batch.append((current, segment, start, offset - start))
+                self._conn.executemany("INSERT INTO terms (term, segment, offset, count) VALUES (?, ?, ?, ?)", batch)
+                self._conn.execute("DELETE FROM terms WHERE segment != ?", (segment,))
+                self._conn.execute("DELETE FROM segments")
+                self._conn.execute("INSERT INTO segments (id, docs) VALUES (?, ?)", (segment, self.doc_count))
+                self._conn.commit()
+            except BaseException:
+                # The old segments are untouched, so the index stays usable
+                self._conn.rollback()
+                try:
+                    os.remove(self._segment_path(segment))
+                except OSError:
+                    pass
+                raise
+            finally:
+                reader.close()
+            self._segments = {segment: self._map(self._segment_path(segment))}
+        for old_segment in old_segments:
+            try:
+                os.remove(self._segment_path(old_segment))
+            except OSError as e:
+                print(f"Error removing merged segment {old_segment}: {str(e)}")
+
+    def _search(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            self._open()
+            if not self.doc_count:
+                return []
+            rows = self._conn.execute(
+                f"SELECT term, segment, offset, count FROM terms WHERE term IN ({','.join('?' * len(terms))})",
+                terms
+            ).fetchall()
+            segments = dict(self._segments)
+            lengths = self._lengths
+            doc_count = self.doc_count
+            average_length = self.total_length / doc_count
+
+        by_term: Dict[str, List[Tuple[int, int, int]]] = defaultdict(list)
+        for term, segment, offset, count in rows:
+            by_term[term].append((segment, offset, count))
+
+        k1, b = self.k1, self.b
+        scores: Dict[int, float] = defaultdict(float)
+        # Terms the index has never seen count at the highest idf, so a judgment matching one
+        # word of a long query does not look like a full match
+        unseen_idf = math.log(1 + (doc_count + 0.5) / 0.5)
+        best_possible = sum(unseen_idf * (k1 + 1) for term in terms if term not in by_term)
+        for term, runs in by_term.items():
+            frequency = sum(count for _, _, count in runs)
+            idf = math.log(1 + (doc_count - frequency + 0.5) / (frequency + 0.5))
+            best_possible += idf * (k1 + 1)
+            if doc_count >= 100 and frequency > self.max_df_ratio * doc_count:
+                continue
+            for segment, offset, count in runs:
+                postings = segments[segment][offset * 2:(offset + count) * 2]
+                for i in range(0, count * 2, 2):
+                    num, tf = postings[i], postings[i + 1]
+                    norm = k1 * (1 - b + b * lengths[num] / average_length)
+                    scores[num] += idf * tf * (k1 + 1) / (tf + norm)
+        if not scores:
+            return []
+
+        top = heapq.nlargest(limit, scores.items(), key=itemgetter(1))
+        with self._lock:
+            metadata = {
+                num: (doc_id, title, snippet)
+                for num, doc_id, title, snippet in self._conn.execute(
+                    f"SELECT num, doc_id, title, snippet FROM documents WHERE num IN ({','.join('?' * len(top))})",
+                    [num for num, _ in top]
+                )
+            }
+        results = []
+        for num, score in top:
+            doc_id, title, snippet = metadata[num]
+            results.append({
+                "doc_id": doc_id,
+                "title": title,
+                "snippet": snippet,
+                # BM25 normalized by the best score the query could reach, comparable across queries
+                "score": round(score / best_possible, 3),
+                "bm25": round(score, 3),
+                "source": "local",
+            })
+        return results
+
+    async def search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._search, query, limit)
+
+    async def add(self, doc_id: str, title: str, text: str, snippet: Optional[str] = None) -> bool:
+        """Queue a judgment for indexing; returns False if it is empty or already indexed"""
+        return await asyncio.to_thread(self._add, str(doc_id), title, text, snippet)
+
+    async def add_kanoon_document(self, doc_id: str, document: Dict[str, Any]) -> bool:
+        """Index a document as returned by IndianKanoonClient.get_case_details"""
+        return await self.add(
+            doc_id, document.get("title", "Untitled Case"), document_text(document), document.get("headline")
+        )
+
+    async def flush(self) -> None:
+        await asyncio.to_thread(self.flush_now)
+
+    def close(self) -> None:
+        """Write pending documents and close the index files"""
+        with self._lock:
+            if self._conn is None:
+                return
+            self._flush()
+            self._conn.close()
+            self._conn = None
+            self._segments = {}
+            self._lengths = memoryview(array.array("I"))
+            self._lock_file.close()
+            self._lock_file = None
+
+def add_directory(index: PrecedentIndex, directory: str) -> int:
+    """Index every .txt file under `directory`: the doc id is `file:` and the file name, the title
+    its first line"""
+    added = 0
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if not name.endswith(".txt"):
+                continue
+            with open(os.path.join(root, name), encoding="utf-8", errors="replace") as f:
+                text = f.read()
+            title = next((line.strip() for line in text.splitlines() if line.strip()), name)
+            added += index._add(f"{LOCAL_DOC_PREFIX}{os.path.splitext(name)[0]}", title, text, None)
+    index.flush_now()
+    return added
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build or query the local precedent index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Add a directory of judgment .txt files to the index")
+    build.add_argument("index")
+    build.add_argument("directory")
+    build.add_argument("--compact", action="store_true", help="Merge all segments after adding")
+    search = commands.add_parser("search", help="Print the top matches for a query")
+    search.add_argument("index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    index = PrecedentIndex(args.index)
+    try:
+        start = time.perf_counter()
+        if args.command == "build":
+            added = add_directory(index, args.directory)
+            if args.compact:
+                index.compact()
+            print(f"added {added} documents ({index.doc_count} total) in {time.perf_counter() - start:.1f}s")
+        else:
+            for result in index._search(args.query, args.limit):
+                print(f"{result['score']:.3f}  {result['doc_id']}  {result['title']}")
+            print(f"{(time.perf_counter() - start) * 1000:.1f}ms")
+    finally:
+        index.close()
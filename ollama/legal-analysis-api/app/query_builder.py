@@ -0,0 +1,129 @@
+# query_builder.py
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+from .classifier import LEGAL_VOCABULARY, MAX_PHRASE_WORDS, TOKEN_PATTERN
+from .models import CaseInput
+
+# Issue types recognised from trigger words, with the phrasing used to search for them
+ISSUE_TYPES: Dict[str, Tuple[Tuple[str, ...], str]] = {
+    "tenancy": (("evict", "eviction", "tenant", "tenancy", "landlord", "rent", "lease", "vacate"), "eviction of tenant"),
+    "cheque": (("cheque", "check bounce", "bounce", "bounced", "dishonour", "dishonoured", "dishonor"), "dishonour of cheque"),
+    "matrimonial": (("divorce", "alimony", "custody", "dowry", "cruelty", "husband", "wife", "marriage"), "matrimonial cruelty divorce"),
+    "domestic violence": (("domestic violence", "in laws", "beaten", "abuse"), "domestic violence"),
+    "property": (("encroachment", "encroached", "partition", "title deed", "sale deed", "possession", "inheritance", "succession", "ancestral"), "property title possession"),
+    "employment": (("wrongful termination", "wrongfully terminated", "salary", "provident fund", "dismissed", "employer", "gratuity"), "wrongful termination of employment"),
+    "consumer": (("consumer", "refund", "defective", "deficiency", "warranty", "consumer forum"), "deficiency in service consumer"),
+    "contract": (("contract", "breach", "breached", "agreement", "damages", "compensation"), "breach of contract damages"),
+    "cheating": (("cheating", "cheated", "fraud", "forgery", "forged", "misappropriation"), "cheating and fraud"),
+    "violent crime": (("murder", "assault", "kidnapping", "robbery", "attacked", "injured"), "criminal assault"),
+    "theft": (("theft", "stolen", "stole"), "theft"),
+    "defamation": (("defamation", "defamatory", "reputation"), "defamation"),
+    "negligence": (("negligence", "negligent", "accident", "medical negligence"), "negligence compensation"),
+}
+
+# Vocabulary terms too generic to narrow a precedent search
+GENERIC_TERMS = frozenset(
+    "court legal law illegal illegally unlawful rights plaintiff defendant lawyer advocate judge hearing "
+    "complaint suit petition dispute appeal judgment accused respondent petitioner appellant notice "
+    "liable liability police refuse consent money rupees lakh loan advance account demand false fake "
+    "cancel certificate abandon withdraw".split()
+) | {"legal notice"}
+
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her him his i in into is it its me my "
+    "of on or our she that the their them they this to was we were which who will with without not "
+    "also after before under over then than there when where while".split()
+)
+
+SECTION_PATTERN = re.compile(
+    r"\b(?:section|sec\.?|s\.|u/s)\s*(\d+[a-z]?)(?:\s*(?:of\s+)?(?:the\s+)?"
+    r"((?:[a-z]+ ){0,5}act|ipc|crpc|cpc|bns|bnss|bsa|ni act))?",
+    re.IGNORECASE
+)
+ARTICLE_PATTERN = re.compile(r"\barticle\s+(\d+[a-z]?)\b", re.IGNORECASE)
+ACT_PATTERN = re.compile(r"\b((?:[A-Z][a-z]+ ){1,6}Act)(?:,? ((?:18|19|20)\d\d))?")
+
+def extract_statutes(text: str) -> List[str]:
+    """Section, article and Act mentions, normalized and in order of appearance"""
+    statutes = []
+    for number, act in SECTION_PATTERN.findall(text):
+        statutes.append(f"section {number.lower()} {act.lower()}".strip())
+    for number in ARTICLE_PATTERN.findall(text):
+        statutes.append(f"article {number.lower()}")
+    for act, year in ACT_PATTERN.findall(text):
+        # An Act already named by a section mention adds nothing
+        if not any(act.lower() in statute for statute in statutes):
+            statutes.append(f"{act} {year}".strip().lower())
+    return list(dict.fromkeys(statutes))
+
+def _phrases(tokens: List[str]) -> Counter:
+    counts: Counter = Counter()
+    for n in range(1, MAX_PHRASE_WORDS + 1):
+        for i in range(len(tokens) - n + 1):
+            counts[" ".join(tokens[i:i + n])] += 1
+    return counts
+
+def detect_issue(phrases: Counter) -> List[str]:
+    """Issue types ranked by how many of their trigger terms occur"""
+    scores = {
+        issue: sum(phrases[trigger] for trigger in triggers)
+        for issue, (triggers, _) in ISSUE_TYPES.items()
+    }
+    return [issue for issue, score in sorted(scores.items(), key=lambda item: -item[1]) if score > 0]
+
+def extract_keyphrases(phrases: Counter, tokens: List[str], limit: int = 5) -> List[str]:
+    """Legal vocabulary found in the case, weighted like the classifier; frequent content
+    words fill in when the case uses little legal vocabulary"""
+    scored = {
+        term: LEGAL_VOCABULARY[term] * (1 + math.log(count))
+        for term, count in phrases.items()
+        if term in LEGAL_VOCABULARY and LEGAL_VOCABULARY[term] > 0 and term not in GENERIC_TERMS
+    }
+    keyphrases = sorted(scored, key=lambda term: -scored[term])
+    # Drop single words already covered by a chosen phrase ("rent" after "rent agreement")
+    keyphrases = [
+        term for term in keyphrases
+        if not any(term != other and term in other.split() for other in keyphrases)
+    ]
+    if len(keyphrases) < 2:
+        content = Counter(token for token in tokens if len(token) > 3 and token not in STOPWORDS)
+        keyphrases += [word for word, _ in content.most_common(limit) if word not in keyphrases]
+    return keyphrases[:limit]
+
+class QueryBuilder:
+    """Builds a short list of Kanoon queries for a case, most specific first.
+
+    Party names are left out: they rarely appear in precedents and make searches come back
+    empty. The facts come from the whole CaseInput rather than a truncated description.
+    """
+
+    def __init__(self, max_queries: int = 3):
+        self.max_queries = max_queries
+
+    def build(self, case_input: CaseInput) -> List[str]:
+        text = "\n".join(
+            part for part in (
+                case_input.description, case_input.timeline, case_input.evidence, case_input.previous_legal_history
+            ) if part
+        )
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        phrases = _phrases(tokens)
+        statutes = extract_statutes(text)
+        issues = detect_issue(phrases)
+        issue = ISSUE_TYPES[issues[0]][1] if issues else ""
+        keyphrases = extract_keyphrases(phrases, tokens)
+
+        queries = []
+        if statutes:
+            queries.append(" ".join([*statutes[:2], issue]))
+        if issue:
+            queries.append(" ".join([issue, *keyphrases[:3]]))
+        if keyphrases:
+            queries.append(" ".join([case_input.case_type, *keyphrases]))
+        # Broadest query: the case type and the opening of the description
+        content = [token for token in tokens if token not in STOPWORDS][:12]
+        queries.append(" ".join([case_input.case_type, *content]))
+        queries = [" ".join(query.split()) for query in queries]
+        return list(dict.fromkeys(query for query in queries if query))[:self.max_queries]
@@ -0,0 +1,72 @@
+# scheduler.py
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, List, Optional
+
+class PriorityScheduler:
+    """Fixed pool of workers that runs submitted jobs in priority order.
+
+    Higher priorities run first; jobs of equal priority run in submission order.
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = workers
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sequence = itertools.count()
+
+    async def start(self) -> None:
+        """Start the worker pool (called from the app lifespan)"""
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self) -> None:
+        """Stop the workers and cancel jobs that have not started"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        while self._queue is not None and not self._queue.empty():
+            *_, future = self._queue.get_nowait()
+            future.cancel()
+
+    def submit(self, fn: Callable[[], Awaitable[Any]], priority: int = 0) -> asyncio.Future:
+        """Queue a job; the returned future resolves with its result.
+
+        Cancelling the future cancels the job, whether it is still queued or already running.
+        """
+        if not self._tasks:
+            raise RuntimeError("PriorityScheduler has not been started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((-priority, next(self._sequence), fn, future))
+        return future
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, fn, future = await self._queue.get()
+            if future.done():
+                continue
+            job = asyncio.ensure_future(fn())
+            future.add_done_callback(lambda f, job=job: job.cancel() if f.cancelled() else None)
+            try:
+                result = await asyncio.shield(job)
+            except asyncio.CancelledError:
+                if not job.done():
+                    # The worker itself is being stopped
+                    job.cancel()
+                    raise
+                if not future.done():
+                    future.cancel()
+                continue
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,157 @@
+# semantic_cache.py
+import asyncio
+import math
+import operator
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Tuple
+import httpx
+from .models import CaseInput, CaseAnalysis
+from .sessions import AnalysisSession
+from .coalesce import canonical_key
+from .metrics import registry
+
+Embedder = Callable[[str], Awaitable[List[float]]]
+Scope = Tuple[str, str]
+
+cache_lookups = registry.counter(
+    "analysis_cache_lookups_total",
+    "Analysis cache lookups by result: exact (identical input), semantic (paraphrase) or miss",
+    labelnames=("result",)
+)
+cache_similarity = registry.histogram(
+    "analysis_cache_best_similarity",
+    "Best cosine similarity found by semantic cache lookups",
+    buckets=(0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.925, 0.95, 0.975, 0.99, 1.0)
+)
+cache_entries = registry.gauge(
+    "analysis_cache_entries",
+    "Case analyses currently held in the analysis cache"
+)
+
+def embedding_text(case_input: CaseInput) -> str:
+    """The part of a case that decides its analysis; party names are left out so that
+    the same story told about different people still matches"""
+    parts = [case_input.description, case_input.timeline, case_input.evidence, case_input.previous_legal_history]
+    return "\n".join(" ".join(part.split()) for part in parts if part)
+
+def case_scope(case_input: CaseInput) -> Scope:
+    """Semantic matches are only allowed between cases of the same type and jurisdiction"""
+    return (" ".join(case_input.case_type.lower().split()), " ".join(case_input.jurisdiction.lower().split()))
+
+def normalize(vector: List[float]) -> Optional[List[float]]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    if not norm:
+        return None
+    return [value / norm for value in vector]
+
+class CacheLookup:
+    """Result of a cache lookup; on a miss it keeps the key and embedding for storing the answer.
+
+    `session` is only set on exact hits: the conversation behind a cached analysis holds the
+    facts and party names of the case it was generated for, so only an identical case may continue it.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        scope: Scope,
+        analysis: Optional[CaseAnalysis] = None,
+        similarity: Optional[float] = None,
+        vector: Optional[List[float]] = None,
+        session: Optional[AnalysisSession] = None
+    ):
+        self.key = key
+        self.scope = scope
+        self.analysis = analysis
+        self.similarity = similarity
+        self.vector = vector
+        self.session = session
+
+class _Entry:
+    def __init__(
+        self,
+        scope: Scope,
+        vector: Optional[List[float]],
+        analysis: CaseAnalysis,
+        session: Optional[AnalysisSession]
+    ):
+        self.scope = scope
+        self.vector = vector
+        self.analysis = analysis
+        self.session = session
+
+class SemanticCache:
+    """In-memory LRU cache of case analyses with two tiers.
+
+    The exact tier matches the canonical request hash and needs no embedding call; the
+    semantic tier embeds the case and returns the closest stored analysis of the same
+    case type and jurisdiction whose cosine similarity reaches `threshold`.
+    """
+
+    def __init__(self, embed: Optional[Embedder] = None, capacity: int = 1000, threshold: float = 0.95):
+        self.embed = embed
+        self.capacity = capacity
+        self.threshold = threshold
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _hit(self, key: str, entry: _Entry, similarity: float) -> CaseAnalysis:
+        self._entries.move_to_end(key)
+        return entry.analysis.copy(update={"cached": True, "cache_similarity": round(similarity, 4)})
+
+    @staticmethod
+    def _nearest(vector: List[float], candidates: List[Tuple[str, List[float]]]) -> Tuple[Optional[str], float]:
+        best_key, best_similarity = None, -1.0
+        for key, candidate in candidates:
+            # Vectors are stored normalized, so the dot product is the cosine similarity
+            similarity = sum(map(operator.mul, vector, candidate))
+            if similarity > best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key, best_similarity
+
+    async def lookup(self, case_input: CaseInput) -> CacheLookup:
+        key = canonical_key(case_input)
+        scope = case_scope(case_input)
+        entry = self._entries.get(key)
+        if entry is not None:
+            cache_lookups.labels(result="exact").inc()
+            return CacheLookup(key, scope, self._hit(key, entry, 1.0), 1.0, session=entry.session)
+
+        if self.embed is None:
+            cache_lookups.labels(result="miss").inc()
+            return CacheLookup(key, scope)
+        try:
+            vector = normalize(await self.embed(embedding_text(case_input)))
+        except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+            print(f"Error embedding case for the analysis cache: {str(e)}")
+            vector = None
+        if vector is not None:
+            candidates = [
+                (candidate_key, entry.vector) for candidate_key, entry in self._entries.items()
+                if entry.vector is not None and entry.scope == scope
+            ]
+            # A full scan of a large cache takes tens of milliseconds, so it runs off the event loop
+            best_key, similarity = await asyncio.to_thread(self._nearest, vector, candidates)
+            if best_key is not None and best_key in self._entries:
+                cache_similarity.observe(similarity)
+                if similarity >= self.threshold:
+                    cache_lookups.labels(result="semantic").inc()
+                    return CacheLookup(key, scope, self._hit(best_key, self._entries[best_key], similarity), similarity)
+        cache_lookups.labels(result="miss").inc()
+        return CacheLookup(key, scope, vector=vector)
+
+    def store(self, lookup: CacheLookup, analysis: CaseAnalysis, session: Optional[AnalysisSession] = None) -> None:
+        """Store the analysis computed after a missed lookup, with the conversation that produced it.
+
+        The analysis is stored without its session_id: sessions belong to the caller they were
+        created for, and expire long before cache entries do.
+        """
+        self._entries[lookup.key] = _Entry(
+            lookup.scope, lookup.vector, analysis.copy(update={"session_id": None}), session
+        )
+        self._entries.move_to_end(lookup.key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        cache_entries.set(len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,70 @@
+# sessions.py
+import array
+import copy
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class AnalysisSession:
+    """Ollama conversation state left by one analysis (or follow-up) generation"""
+
+    def __init__(self, done: Dict[str, Any]):
+        # Token ids are stored compactly; a 4k context is 16 KB instead of ~110 KB as a list
+        self.context = array.array("i", done["context"])
+        self.model: str = done.get("model", "")
+        self.backend: Optional[str] = done.get("backend")
+        # Seconds per prompt token on the backend, used to estimate what reusing the context saves
+        prompt_tokens = done.get("prompt_eval_count", 0)
+        duration = done.get("prompt_eval_duration", 0) / 1e9
+        self.prompt_eval_rate = duration / prompt_tokens if prompt_tokens and duration else 0.0
+        self.last_used = time.monotonic()
+
+    def copy(self) -> "AnalysisSession":
+        """An independent session continuing from the same context (which is never modified, so it is shared)"""
+        session = copy.copy(self)
+        session.last_used = time.monotonic()
+        return session
+
+class SessionStore:
+    """Bounded in-memory store of analysis sessions, evicting the least recently used beyond
+    `max_sessions` and any idle for longer than `ttl` seconds"""
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 1800.0):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, AnalysisSession]" = OrderedDict()
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[session_id]
+
+    def create(self, done: Dict[str, Any]) -> Optional[str]:
+        """Store the state from a finished generation; returns None if Ollama sent no context"""
+        if not done.get("context"):
+            return None
+        return self.add(AnalysisSession(done))
+
+    def add(self, session: AnalysisSession) -> str:
+        """Store a session under a new id"""
+        self._expire()
+        session_id = uuid.uuid4().hex
+        self._sessions[session_id] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session_id
+
+    def get(self, session_id: str) -> Optional[AnalysisSession]:
+        self._expire()
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_used = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._sessions)
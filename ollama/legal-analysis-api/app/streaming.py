@@ -0,0 +1,101 @@
+# streaming.py
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SECTION_HEADERS = ("WIN_PROBABILITY", "UNFAVORABLE_POINTS", "FAVORABLE_POINTS", "LEGAL_BASIS")
+
+Event = Tuple[str, Dict[str, Any]]
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+class AnalysisStreamParser:
+    """Incrementally parse the WIN_PROBABILITY/FAVORABLE_POINTS/UNFAVORABLE_POINTS/LEGAL_BASIS
+    answer while Mistral is still generating it, producing typed events as soon as each piece is complete"""
+
+    def __init__(self):
+        self.section: Optional[str] = None
+        self.win_probability: Optional[float] = None
+        self.favorable_points: List[str] = []
+        self.unfavorable_points: List[str] = []
+        self.legal_basis = ""
+        self._buffer = ""
+
+    def feed(self, text: str) -> List[Event]:
+        """Consume the next streamed tokens and return any events they complete"""
+        self._buffer += text
+        events: List[Event] = []
+        while self._buffer:
+            if self.section == "LEGAL_BASIS":
+                # The legal basis is free text and the last section, so forward it as it arrives
+                events.extend(self._legal_basis_delta(self._buffer))
+                self._buffer = ""
+                break
+            newline = self._buffer.find("\n")
+            if newline == -1:
+                break
+            line, self._buffer = self._buffer[:newline], self._buffer[newline + 1:]
+            events.extend(self._handle_line(line))
+        return events
+
+    def close(self) -> List[Event]:
+        """Flush whatever is left once the stream has ended"""
+        remaining, self._buffer = self._buffer, ""
+        if not remaining:
+            return []
+        if self.section == "LEGAL_BASIS":
+            return self._legal_basis_delta(remaining)
+        return self._handle_line(remaining, ended=False)
+
+    def result(self) -> Tuple[float, List[str], List[str], str]:
+        """Return the parsed analysis, with the same fallback as MistralClient.analyze_case"""
+        if self.win_probability is None:
+            return 0.5, ["Could not determine"], ["Could not determine"], "Analysis incomplete due to formatting issues"
+        return self.win_probability, self.favorable_points, self.unfavorable_points, self.legal_basis.strip()
+
+    def _handle_line(self, line: str, ended: bool = True) -> List[Event]:
+        stripped = line.strip()
+        if not stripped:
+            return []
+
+        header = next((h for h in SECTION_HEADERS if stripped.upper().startswith(h + ":")), None)
+        if header:
+            self.section = header
+            rest = stripped[len(header) + 1:].strip()
+            if header == "WIN_PROBABILITY":
+                return self._parse_probability(rest)
+            if header == "LEGAL_BASIS" and rest:
+                # The text may go on over the next lines, so the line break is part of it
+                return self._legal_basis_delta(rest + "\n" if ended else rest)
+            return []
+
+        if self.section in ("FAVORABLE_POINTS", "UNFAVORABLE_POINTS"):
+            point = stripped.strip("-*• ").strip()
+            if not point or point == "...":
+                return []
+            if self.section == "FAVORABLE_POINTS":
+                self.favorable_points.append(point)
+                return [("favorable_point", {"index": len(self.favorable_points) - 1, "text": point})]
+            self.unfavorable_points.append(point)
+            return [("unfavorable_point", {"index": len(self.unfavorable_points) - 1, "text": point})]
+
+        if self.section == "WIN_PROBABILITY" and self.win_probability is None:
+            return self._parse_probability(stripped)
+        return []
+
+    def _parse_probability(self, text: str) -> List[Event]:
+        match = re.search(r"\d+(?:\.\d+)?", text)
+        if not match:
+            return []
+        self.win_probability = min(float(match.group()) / 100, 1.0)
+        return [("probability", {"win_probability": self.win_probability})]
+
+    def _legal_basis_delta(self, text: str) -> List[Event]:
+        if not self.legal_basis:
+            text = text.lstrip()
+            if not text:
+                return []
+        self.legal_basis += text
+        return [("legal_basis", {"delta": text})]
@@ -0,0 +1,77 @@
+# timing.py
+import asyncio
+import time
+from typing import Any, Awaitable, Dict, Set, TypeVar
+from .metrics import registry
+
+T = TypeVar("T")
+
+stage_seconds = registry.histogram(
+    "analysis_stage_duration_seconds",
+    "Duration of completed analysis pipeline stages",
+    labelnames=("stage",)
+)
+stages_in_flight = registry.gauge(
+    "analysis_stages_in_flight",
+    "Analysis pipeline stages currently running",
+    labelnames=("stage",)
+)
+stage_errors = registry.counter(
+    "analysis_stage_errors_total",
+    "Analysis pipeline stages that raised an error",
+    labelnames=("stage",)
+)
+stages_cancelled = registry.counter(
+    "analysis_stages_cancelled_total",
+    "Analysis pipeline stages cancelled because another stage settled the outcome",
+    labelnames=("stage",)
+)
+
+class StageTimings:
+    """Wall-clock duration of each pipeline stage of one request"""
+
+    def __init__(self):
+        self.durations: Dict[str, float] = {}
+        self.cancelled: Set[str] = set()
+
+    async def track(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """Await a stage, recording its duration even if it is cancelled"""
+        in_flight = stages_in_flight.labels(stage=stage)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            result = await awaitable
+        except asyncio.CancelledError:
+            self.cancelled.add(stage)
+            stages_cancelled.labels(stage=stage).inc()
+            raise
+        except Exception:
+            stage_errors.labels(stage=stage).inc()
+            raise
+        finally:
+            in_flight.dec()
+            self.durations[stage] = (time.perf_counter() - start) * 1000
+        # Cancelled stages would skew the distribution towards zero, so only completed ones are observed
+        stage_seconds.labels(stage=stage).observe(self.durations[stage] / 1000)
+        return result
+
+    def record(self, stage: str, duration: float) -> None:
+        """Record a stage that was timed by the caller (duration in ms)"""
+        self.durations[stage] = duration
+        stage_seconds.labels(stage=stage).observe(duration / 1000)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            stage: {"ms": round(duration, 1), "cancelled": stage in self.cancelled}
+            for stage, duration in self.durations.items()
+        }
+
+    def server_timing(self) -> str:
+        """Render the timings as a Server-Timing header value"""
+        entries = []
+        for stage, duration in self.durations.items():
+            entry = f"{stage};dur={duration:.1f}"
+            if stage in self.cancelled:
+                entry += ';desc="cancelled"'
+            entries.append(entry)
+        return ", ".join(entries)
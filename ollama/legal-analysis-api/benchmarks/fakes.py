@@ -0,0 +1,177 @@
+# fakes.py
+"""Local stand-ins for Ollama and the Indian Kanoon API used by the load benchmark.
+
+Both servers answer with canned responses after a delay drawn from a configurable
+latency distribution, so the analysis API can be exercised with no network or GPU:
+
+    python -m benchmarks.fakes ollama --port 11500 --latency lognormal:0.5,0.4
+    python -m benchmarks.fakes kanoon --port 11501 --latency uniform:0.05,0.2
+
+Latency specs: `fixed:S`, `uniform:LOW,HIGH`, `normal:MEAN,STDDEV` or
+`lognormal:MEDIAN,SIGMA` (seconds).
+"""
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+ANALYSIS_ANSWER = """WIN_PROBABILITY: 65%
+
+FAVORABLE_POINTS:
+- The registered rent agreement fixes the tenancy period
+- Rent has been paid regularly and receipts are available
+
+UNFAVORABLE_POINTS:
+- The tenant did not reply to the landlord's first notice
+
+LEGAL_BASIS:
+Under the applicable Rent Control Act a tenant cannot be evicted without due notice and
+an order of the Rent Controller, and courts have consistently held that self-help eviction
+is unlawful."""
+
+ANALYSIS_JSON = {
+    "win_probability": 65,
+    "favorable_points": [
+        "The registered rent agreement fixes the tenancy period",
+        "Rent has been paid regularly and receipts are available",
+    ],
+    "unfavorable_points": ["The tenant did not reply to the landlord's first notice"],
+    "legal_basis": "Under the applicable Rent Control Act a tenant cannot be evicted without due notice.",
+}
+
+def parse_latency(spec: str) -> Callable[[], float]:
+    """Turn a latency spec such as `lognormal:0.5,0.4` into a sampler returning seconds"""
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    if kind == "fixed":
+        return lambda: values[0]
+    if kind == "uniform":
+        return lambda: random.uniform(values[0], values[1])
+    if kind == "normal":
+        return lambda: max(0.0, random.gauss(values[0], values[1]))
+    if kind == "lognormal":
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+def create_ollama_app(latency: Callable[[], float], classify_latency: Callable[[], float]) -> FastAPI:
+    """Fake Ollama exposing /api/generate (streamed or not), /api/embed and /api/tags"""
+    app = FastAPI(title="Fake Ollama")
+
+    def stats(elapsed: float, tokens: int) -> Dict[str, Any]:
+        return {
+            "done": True,
+            "total_duration": int(elapsed * 1e9),
+            "load_duration": 1_000_000,
+            "prompt_eval_count": 200,
+            "prompt_eval_duration": int(elapsed * 0.2e9),
+            "eval_count": tokens,
+            "eval_duration": int(elapsed * 0.8e9),
+            "context": list(range(32)),
+        }
+
+    @app.get("/api/tags")
+    async def tags():
+        return {"models": [{"name": "mistral:latest"}]}
+
+    @app.post("/api/embed")
+    async def embed(request: Request):
+        body = await request.json()
+        inputs = body.get("input", "")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        await asyncio.sleep(classify_latency())
+        embeddings = []
+        for text in inputs:
+            rng = random.Random(text)
+            embeddings.append([rng.uniform(-1, 1) for _ in range(64)])
+        return {"model": body.get("model"), "embeddings": embeddings}
+
+    @app.post("/api/generate")
+    async def generate(request: Request):
+        body = await request.json()
+        prompt = body.get("prompt", "")
+        if not prompt:
+            # Preload request: nothing to generate
+            return {"model": body.get("model"), "response": "", **stats(0.0, 0)}
+        is_classification = "Return only 'YES'" in prompt
+        if is_classification:
+            text, delay = "YES", classify_latency()
+        elif body.get("format"):
+            text, delay = json.dumps(ANALYSIS_JSON), latency()
+        else:
+            text, delay = ANALYSIS_ANSWER, latency()
+        tokens = text.split(" ")
+
+        if not body.get("stream", True):
+            await asyncio.sleep(delay)
+            return {"model": body.get("model"), "response": text, **stats(delay, len(tokens))}
+
+        async def chunks():
+            start = time.perf_counter()
+            per_token = delay / max(len(tokens), 1)
+            for i, token in enumerate(tokens):
+                await asyncio.sleep(per_token)
+                piece = token if i == 0 else " " + token
+                yield json.dumps({"model": body.get("model"), "response": piece, "done": False}) + "\n"
+            final = {"model": body.get("model"), "response": "", **stats(time.perf_counter() - start, len(tokens))}
+            yield json.dumps(final) + "\n"
+
+        return StreamingResponse(chunks(), media_type="application/x-ndjson")
+
+    return app
+
+def create_kanoon_app(latency: Callable[[], float], results: int = 5, empty_ratio: float = 0.0) -> FastAPI:
+    """Fake Indian Kanoon search API answering /search/ and /search/{doc_id}"""
+    app = FastAPI(title="Fake Indian Kanoon")
+
+    def doc(doc_id: int) -> Dict[str, Any]:
+        return {
+            "doc_id": str(doc_id),
+            "tid": doc_id,
+            "title": f"Sharma v. Gupta ({2000 + doc_id % 24})",
+            "snippet": "The tenant cannot be evicted without notice under the Rent Control Act.",
+            "score": round(1.0 - doc_id / 100, 3),
+        }
+
+    @app.get("/search/")
+    async def search(query: str = "", max_results: int = 5):
+        await asyncio.sleep(latency())
+        if random.random() < empty_ratio:
+            return {"docs": []}
+        seed = abs(hash(query)) % 50
+        docs: List[Dict[str, Any]] = [doc(seed + i) for i in range(min(max_results, results))]
+        return {"docs": docs}
+
+    @app.get("/search/{doc_id}")
+    async def document(doc_id: int):
+        await asyncio.sleep(latency())
+        paragraphs = [
+            f"{i}. The landlord contended that the tenancy stood terminated by notice, "
+            "while the tenant relied on the protection of the Rent Control Act." for i in range(1, 40)
+        ]
+        return {**doc(doc_id), "doc": "\n\n".join(paragraphs)}
+
+    return app
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run a fake upstream for the load benchmark")
+    parser.add_argument("service", choices=["ollama", "kanoon"])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, required=True)
+    parser.add_argument("--latency", default="fixed:0.5", help="Generation/search latency distribution")
+    parser.add_argument("--classify-latency", default="fixed:0.1", help="Latency of YES/NO and embedding calls (ollama)")
+    parser.add_argument("--empty-ratio", type=float, default=0.0, help="Share of searches returning no docs (kanoon)")
+    args = parser.parse_args()
+
+    if args.service == "ollama":
+        fake = create_ollama_app(parse_latency(args.latency), parse_latency(args.classify_latency))
+    else:
+        fake = create_kanoon_app(parse_latency(args.latency), empty_ratio=args.empty_ratio)
+    uvicorn.run(fake, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,276 @@
+# load.py
+"""End-to-end load benchmark for the analysis API against local fake upstreams.
+
+Starts the fake Ollama and Indian Kanoon servers (benchmarks/fakes.py) and `app.main:app`
+as separate processes on free local ports, drives /analyze-case (or its SSE variant) at
+the configured concurrency and reports throughput plus p50/p95/p99 latency overall and
+per pipeline stage (from the Server-Timing header). A probe hits /metrics throughout the
+run: if its latency tracks the upstream latency, something is blocking the event loop.
+
+Run from ollama/legal-analysis-api:
+
+    python -m benchmarks.load --requests 200 --concurrency 20 --ollama-latency lognormal:0.5,0.4
+
+No network access or GPU is needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASE_TEMPLATE = {
+    "case_type": "civil",
+    "jurisdiction": "Delhi",
+    "plaintiff": "Ramesh Kumar",
+    "defendant": "Suresh Gupta",
+    "description": (
+        "The landlord is trying to evict the tenant from the rented premises without serving "
+        "notice, although the registered rent agreement runs for another two years (case {n})."
+    ),
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Stage durations in seconds from a Server-Timing header, skipping cancelled stages"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, *params = entry.split(";")
+        if any(param.startswith("desc=") and "cancelled" in param for param in params):
+            continue
+        for param in params:
+            if param.startswith("dur="):
+                stages[name] = float(param[4:]) / 1000
+    return stages
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=SERVICE_DIR,
+        env={**os.environ, **env},
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+
+async def wait_until_ready(url: str, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited early:\n{process.stderr.read().decode()}")
+            try:
+                await client.get(url, timeout=1.0)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+class Results:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_event: List[float] = []
+        self.stages: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, int] = {}
+        self.probe_latencies: List[float] = []
+
+    def add_status(self, status: str) -> None:
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+async def drive(base_url: str, args: argparse.Namespace, results: Results) -> float:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    queue: asyncio.Queue = asyncio.Queue()
+    for n in range(args.requests):
+        queue.put_nowait(n)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+
+        async def one(n: int) -> None:
+            case = dict(CASE_TEMPLATE)
+            case["description"] = case["description"].format(n=n % args.distinct_cases)
+            start = time.perf_counter()
+            try:
+                if args.stream:
+                    async with client.stream("POST", "/analyze-case/stream", json=case) as response:
+                        first = None
+                        event = None
+                        async for line in response.aiter_lines():
+                            if line.startswith("event:"):
+                                event = line[6:].strip()
+                                if first is None:
+                                    first = time.perf_counter() - start
+                            elif line.startswith("data:") and event == "timings":
+                                for stage, value in json.loads(line[5:]).items():
+                                    if not value.get("cancelled"):
+                                        results.stages.setdefault(stage, []).append(value["ms"] / 1000)
+                        if first is not None:
+                            results.first_event.append(first)
+                        results.add_status(str(response.status_code))
+                else:
+                    response = await client.post("/analyze-case", json=case)
+                    results.add_status(str(response.status_code))
+                    for stage, seconds in parse_server_timing(response.headers.get("server-timing", "")).items():
+                        results.stages.setdefault(stage, []).append(seconds)
+            except httpx.HTTPError as e:
+                results.add_status(type(e).__name__)
+                return
+            results.latencies.append(time.perf_counter() - start)
+
+        async def worker() -> None:
+            while not queue.empty():
+                await one(queue.get_nowait())
+
+        async def probe(stop: asyncio.Event) -> None:
+            async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as probe_client:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    await probe_client.get("/metrics")
+                    results.probe_latencies.append(time.perf_counter() - start)
+                    await asyncio.sleep(args.probe_interval)
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(stop))
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await probe_task
+    return elapsed
+
+def summarize(name: str, values: List[float]) -> str:
+    return (
+        f"{name:<22} n={len(values):<5} p50={percentile(values, 0.50) * 1000:8.1f}ms "
+        f"p95={percentile(values, 0.95) * 1000:8.1f}ms p99={percentile(values, 0.99) * 1000:8.1f}ms"
+    )
+
+def report(results: Results, elapsed: float, args: argparse.Namespace) -> Dict[str, Any]:
+    def stats(values: List[float]) -> Dict[str, float]:
+        return {
+            "count": len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+        }
+
+    summary = {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "elapsed_seconds": elapsed,
+        "throughput_rps": len(results.latencies) / elapsed if elapsed else 0.0,
+        "statuses": results.statuses,
+        "latency": stats(results.latencies),
+        "stages": {stage: stats(values) for stage, values in results.stages.items()},
+        "metrics_probe": stats(results.probe_latencies),
+    }
+    if results.first_event:
+        summary["first_event"] = stats(results.first_event)
+    return summary
+
+def print_report(results: Results, summary: Dict[str, Any]) -> None:
+    print(f"requests={summary['requests']} concurrency={summary['concurrency']} "
+          f"elapsed={summary['elapsed_seconds']:.2f}s throughput={summary['throughput_rps']:.2f} req/s")
+    print(f"statuses: {summary['statuses']}")
+    print(summarize("end-to-end", results.latencies))
+    if results.first_event:
+        print(summarize("first SSE event", results.first_event))
+    for stage, values in results.stages.items():
+        print(summarize(f"stage {stage}", values))
+    print(summarize("/metrics probe", results.probe_latencies))
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    ollama_port, kanoon_port, app_port = free_port(), free_port(), free_port()
+    cache_dir = tempfile.mkdtemp(prefix="legal-analysis-bench-")
+    processes = []
+    try:
+        ollama = start_process(
+            ["-m", "benchmarks.fakes", "ollama", "--port", str(ollama_port),
+             "--latency", args.ollama_latency, "--classify-latency", args.classify_latency], {}
+        )
+        kanoon = start_process(
+            ["-m", "benchmarks.fakes", "kanoon", "--port", str(kanoon_port),
+             "--latency", args.kanoon_latency, "--empty-ratio", str(args.empty_ratio)], {}
+        )
+        processes += [ollama, kanoon]
+        await wait_until_ready(f"http://127.0.0.1:{ollama_port}/api/tags", ollama)
+        await wait_until_ready(f"http://127.0.0.1:{kanoon_port}/search/?query=ping", kanoon)
+
+        env = {
+            "OLLAMA_BASE_URL": f"http://127.0.0.1:{ollama_port}/api",
+            "INDIAN_KANOON_BASE_URL": f"http://127.0.0.1:{kanoon_port}/search/",
+            "INDIAN_KANOON_API_KEY": "benchmark",
+            "KANOON_CACHE_PATH": os.path.join(cache_dir, "search.sqlite3") if args.search_cache else "",
+            # Judgments from the fake Kanoon must never reach the real index, and a warm index
+            # would stop the run measuring Kanoon at all
+            "PRECEDENT_INDEX_PATH": os.path.join(cache_dir, "precedent_index") if args.precedent_index else "",
+        }
+        env.update(dict(item.split("=", 1) for item in args.env))
+        app = start_process(
+            ["-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--log-level", "warning"], env
+        )
+        processes.append(app)
+        base_url = f"http://127.0.0.1:{app_port}"
+        await wait_until_ready(f"{base_url}/metrics", app)
+
+        results = Results()
+        elapsed = await drive(base_url, args, results)
+        summary = report(results, elapsed, args)
+        if args.json:
+            print(json.dumps(summary, indent=2))
+        else:
+            print_report(results, summary)
+        return summary
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load-test the analysis API against local fake upstreams")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--stream", action="store_true", help="Drive /analyze-case/stream instead of /analyze-case")
+    parser.add_argument("--distinct-cases", type=int, default=1_000_000,
+                        help="Number of distinct case descriptions to cycle through (lower values exercise caching/coalescing)")
+    parser.add_argument("--ollama-latency", default="lognormal:0.5,0.3")
+    parser.add_argument("--classify-latency", default="fixed:0.1")
+    parser.add_argument("--kanoon-latency", default="uniform:0.05,0.2")
+    parser.add_argument("--empty-ratio", type=float, default=0.0)
+    parser.add_argument("--search-cache", action="store_true", help="Enable the persistent Kanoon search cache")
+    parser.add_argument("--precedent-index", action="store_true",
+                        help="Enable the local precedent index (starts empty in a temp dir)")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--probe-interval", type=float, default=0.25)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the API process, e.g. OLLAMA_MAX_CONCURRENT_GENERATIONS=8")
+    parser.add_argument("--json", action="store_true", help="Print the summary as JSON")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
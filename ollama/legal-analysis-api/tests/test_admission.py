@@ -0,0 +1,80 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app import main
+from app.admission import AdmissionController, AdmissionRejected
+from app.models import CaseInput
+
+CASE = {
+    "case_type": "Civil",
+    "jurisdiction": "Delhi",
+    "plaintiff": "Asha Verma",
+    "defendant": "Landlord",
+    "description": "My landlord locked me out of the flat.",
+}
+
+async def fill(controller: AdmissionController, waiting: int) -> asyncio.Event:
+    """Hold every slot and queue `waiting` more generations until the returned event is set"""
+    release = asyncio.Event()
+
+    async def generation():
+        async with controller.slot():
+            await release.wait()
+
+    for _ in range(controller.max_concurrent + waiting):
+        asyncio.create_task(generation())
+    await asyncio.sleep(0)
+    return release
+
+def test_check_rejects_only_when_the_queue_is_full():
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        controller.check()
+        release = await fill(controller, waiting=0)
+        controller.check()
+        release.set()
+        await asyncio.sleep(0)
+
+        release = await fill(controller, waiting=1)
+        with pytest.raises(AdmissionRejected) as rejected:
+            controller.check()
+        assert rejected.value.status_code == 429
+        with controller.patient():
+            controller.check()
+        release.set()
+
+    asyncio.run(run())
+
+@pytest.fixture
+def overloaded(monkeypatch):
+    """A full admission queue and an upstream that records whether it was reached"""
+    searched = []
+
+    async def classify_and_search(case_input, kanoon_client, timings):
+        searched.append(case_input.plaintiff)
+        return None, []
+
+    monkeypatch.setattr(main, "analysis_cache", None)
+    monkeypatch.setattr(main, "classify_and_search", classify_and_search)
+    return searched
+
+def test_analysis_is_rejected_before_searching(overloaded, monkeypatch):
+    async def run():
+        controller = AdmissionController(max_concurrent=1, max_queue=1)
+        monkeypatch.setattr(main, "admission_controller", controller)
+        release = await fill(controller, waiting=1)
+        try:
+            with pytest.raises(AdmissionRejected):
+                await main.run_analysis(CaseInput(**CASE), kanoon_client=None)
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await client.post("/analyze-case/stream", json=CASE)
+            assert response.status_code == 429
+            assert int(response.headers["Retry-After"]) >= 1
+        finally:
+            release.set()
+
+    asyncio.run(run())
+    assert overloaded == []
@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from app import main
+from app.models import CaseInput
+from app.semantic_cache import SemanticCache
+from app.sessions import AnalysisSession, SessionStore
+
+def make_case(plaintiff: str, description: str) -> CaseInput:
+    return CaseInput(
+        case_type="Civil",
+        jurisdiction="Delhi",
+        plaintiff=plaintiff,
+        defendant="Landlord",
+        description=description,
+    )
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """run_analysis with the cache and session store live and every upstream faked"""
+    async def embed(text):
+        # Every case is a paraphrase of every other one
+        return [1.0, 0.0, 0.0]
+
+    async def classify_and_search(case_input, kanoon_client, timings):
+        return None, [{"doc_id": "1", "title": "Sharma v. Gupta"}]
+
+    async def select_passages(case_input, similar_cases, kanoon_client):
+        return similar_cases
+
+    async def analyze_case(case_data, similar_cases, done=None):
+        done.update(
+            context=[len(case_data["plaintiff"]), 1, 2, 3],
+            model="mistral:latest",
+            prompt_eval_count=4,
+            prompt_eval_duration=4_000_000
+        )
+        return 65.0, ["Rent receipts"], ["No reply to notice"], "Rent Control Act"
+
+    cache = SemanticCache(embed=embed, threshold=0.9)
+    store = SessionStore()
+    monkeypatch.setattr(main, "analysis_cache", cache)
+    monkeypatch.setattr(main, "session_store", store)
+    monkeypatch.setattr(main, "classify_and_search", classify_and_search)
+    monkeypatch.setattr(main, "select_passages", select_passages)
+    monkeypatch.setattr(main.mistral_client, "analyze_case", analyze_case)
+    return cache, store
+
+def analyze(case_input):
+    analysis, _ = asyncio.run(main.run_analysis(case_input, kanoon_client=None))
+    return analysis
+
+def test_paraphrased_case_does_not_get_the_first_callers_session(pipeline):
+    cache, store = pipeline
+    first = analyze(make_case("Asha Verma", "My landlord locked me out of the flat."))
+    second = analyze(make_case("Ravi Kumar", "The owner locked me out of my rented flat."))
+
+    assert first.session_id is not None and not first.cached
+    assert second.cached and second.cache_similarity == 1.0
+    assert second.session_id is None
+    assert len(store) == 1
+
+def test_identical_case_gets_a_fresh_session_with_the_same_context(pipeline):
+    cache, store = pipeline
+    case_input = make_case("Asha Verma", "My landlord locked me out of the flat.")
+    first = analyze(case_input)
+    second = analyze(case_input)
+
+    assert second.cached
+    assert second.session_id not in (None, first.session_id)
+    assert list(store.get(second.session_id).context) == list(store.get(first.session_id).context)
+
+def test_cached_analysis_is_stored_without_a_session_id(pipeline):
+    cache, store = pipeline
+    analyze(make_case("Asha Verma", "My landlord locked me out of the flat."))
+
+    (entry,) = cache._entries.values()
+    assert entry.analysis.session_id is None
+
+def test_follow_up_savings_count_the_whole_conversation(monkeypatch):
+    store = SessionStore()
+    monkeypatch.setattr(main, "session_store", store)
+    contexts = iter([list(range(1000)), list(range(1100))])
+
+    async def generate_response(prompt, call, context, model, backend, done):
+        # The context is reused, so only the 20 question tokens are evaluated, at 1 ms each
+        done.update(context=next(contexts), model=model, prompt_eval_count=20, prompt_eval_duration=20_000_000)
+        return "Yes, the notice period applies."
+
+    monkeypatch.setattr(main.mistral_client, "generate_response", generate_response)
+    # The analysis read its 900-token prompt at 1 ms per token and left a 960-token context
+    session_id = store.add(AnalysisSession({
+        "context": list(range(960)), "model": "mistral:latest",
+        "prompt_eval_count": 900, "prompt_eval_duration": 900_000_000,
+    }))
+
+    async def ask(session_id):
+        return await main.follow_up(session_id, main.FollowUpQuestion(question="Does the notice period apply?"))
+
+    first = asyncio.run(ask(session_id))
+    second = asyncio.run(ask(first.session_id))
+
+    assert first.prompt_eval_saved_ms == pytest.approx(960.0)
+    # Resubmitting the second question would mean re-reading the first follow-up's 1000-token context
+    assert second.context_tokens == 1000
+    assert second.prompt_eval_saved_ms == pytest.approx(1000.0)
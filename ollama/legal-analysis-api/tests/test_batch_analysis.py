@@ -0,0 +1,77 @@
+import asyncio
+import json
+
+import httpx
+
+from app import main
+from app.models import CaseAnalysis
+from app.scheduler import PriorityScheduler
+from app.timing import StageTimings
+
+CASE = {
+    "case_type": "Civil",
+    "jurisdiction": "Delhi",
+    "plaintiff": "Asha Verma",
+    "defendant": "Landlord",
+    "description": "My landlord locked me out of the flat.",
+}
+
+async def fake_run_batch_analysis(case_input, kanoon_client):
+    analysis = CaseAnalysis(
+        win_probability=65.0,
+        favorable_points=[],
+        unfavorable_points=[],
+        references=[],
+        legal_basis="Rent Control Act",
+        is_law_related=True,
+    )
+    return analysis, StageTimings()
+
+def post_batch(monkeypatch, body, timeout: float = 5.0):
+    monkeypatch.setattr(main, "run_batch_analysis", fake_run_batch_analysis)
+
+    async def run():
+        scheduler = PriorityScheduler(workers=2)
+        monkeypatch.setattr(main, "batch_scheduler", scheduler)
+        await scheduler.start()
+        try:
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                response = await asyncio.wait_for(
+                    client.post(
+                        "/analyze-cases",
+                        content=body(),
+                        headers={"content-type": "application/x-ndjson"},
+                    ),
+                    timeout,
+                )
+                return [json.loads(line) for line in response.text.splitlines()]
+        finally:
+            await scheduler.close()
+
+    return asyncio.run(run())
+
+def test_slow_ndjson_upload_ends_after_one_line_per_case(monkeypatch):
+    async def body():
+        yield (json.dumps(CASE) + "\n").encode()
+        # The first case finishes while the upload is still going
+        await asyncio.sleep(0.2)
+        yield (json.dumps(CASE) + "\n").encode()
+
+    lines = post_batch(monkeypatch, body)
+    assert sorted(line["index"] for line in lines) == [0, 1]
+    assert all("analysis" in line for line in lines)
+
+def test_ndjson_upload_reports_invalid_lines_and_the_limit(monkeypatch):
+    monkeypatch.setattr(main, "BATCH_MAX_CASES", 2)
+
+    async def body():
+        yield b"{not json}\n"
+        await asyncio.sleep(0.05)
+        yield (json.dumps(CASE) + "\n" + json.dumps(CASE) + "\n").encode()
+
+    lines = sorted(post_batch(monkeypatch, body), key=lambda line: line["index"])
+    assert [line["index"] for line in lines] == [0, 1, 2]
+    assert lines[0]["error"].startswith("Invalid JSON")
+    assert "analysis" in lines[1]
+    assert lines[2]["error"] == "Batch is limited to 2 cases"
@@ -0,0 +1,44 @@
+import pytest
+
+from app.classifier import (
+    EVAL_SET_PATH, HOLDOUT_SET_PATH, LegalTextClassifier, base_form, evaluate, load_eval_set,
+)
+
+@pytest.mark.parametrize("word, expected", [
+    ("encroached", "encroach"),
+    ("breached", "breach"),
+    ("blackmailing", "blackmail"),
+    ("forged", "forge"),
+    ("sued", "sue"),
+    ("courts", "court"),
+    ("restaurants", "restaurant"),
+    ("movies", "movie"),
+    ("arrested", "arrested"),
+    ("refusing", "refuse"),
+    ("terminated", "terminate"),
+    ("bed", "bed"),
+    ("photosynthesis", "photosynthesis"),
+])
+def test_base_form_maps_inflections_to_vocabulary(word, expected):
+    assert base_form(word) == expected
+
+def test_inflections_score_like_their_base_form():
+    classifier = LegalTextClassifier()
+    assert classifier.score("they encroached on it") == classifier.score("they encroach on it")
+    assert classifier.score("some songs") == classifier.score("some song")
+
+def test_holdout_set_is_separate_from_the_tuning_set():
+    tuning = {text for text, _ in load_eval_set(EVAL_SET_PATH)}
+    holdout = load_eval_set(HOLDOUT_SET_PATH)
+    assert holdout
+    assert not tuning & {text for text, _ in holdout}
+
+def test_text_without_legal_evidence_is_decided_locally():
+    classifier = LegalTextClassifier()
+    assert classifier.decide("Explain the rules of chess to a seven year old.") is False
+    assert classifier.decide("How do I get rid of ants in my kitchen?") is False
+
+def test_holdout_set_is_mostly_decided_locally_and_accurately():
+    results = evaluate(LegalTextClassifier(), load_eval_set(HOLDOUT_SET_PATH))
+    assert results["coverage"] >= 0.5
+    assert results["local_accuracy"] >= 0.85
@@ -0,0 +1,29 @@
+import pytest
+
+from app.metrics import MetricsRegistry, _Metric
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    counter = registry.counter("requests_total", "Requests", ["path"])
+    counter.labels(path='C:\\cases\n"draft"').inc()
+    assert 'requests_total{path="C:\\\\cases\\n\\"draft\\""} 1' in registry.render().splitlines()
+
+def test_help_text_escapes_backslashes_and_newlines_only():
+    registry = MetricsRegistry()
+    registry.gauge("queue_depth", 'Jobs "waiting"\nin C:\\queue')
+    assert registry.render().splitlines()[0] == '# HELP queue_depth Jobs "waiting"\\nin C:\\\\queue'
+
+def test_histogram_labels_are_escaped_on_every_series():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ["stage"], buckets=[1.0])
+    histogram.labels(stage='a"b').observe(0.5)
+    series = [line for line in registry.render().splitlines() if not line.startswith("#")]
+    assert len(series) == 4
+    assert all('stage="a\\"b"' in line for line in series)
+
+def test_metric_without_children_cannot_be_instantiated():
+    class Incomplete(_Metric):
+        kind = "gauge"
+
+    with pytest.raises(TypeError):
+        Incomplete("incomplete", "Missing _new_child")
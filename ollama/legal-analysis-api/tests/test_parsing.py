@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from app.parsing import _probability, parse_analysis_json, parse_analysis_sections
+
+@pytest.mark.parametrize("value, expected", [
+    (1, 0.01),
+    ("1%", 0.01),
+    (0.65, 0.65),
+    (65, 0.65),
+    ("65%", 0.65),
+    ("65", 0.65),
+    ("65.5 %", 0.655),
+    ("0.5%", 0.005),
+    (0, 0.0),
+    (100, 1.0),
+    (140, 1.0),
+])
+def test_probability_follows_the_0_to_100_schema(value, expected):
+    assert _probability(value) == pytest.approx(expected)
+
+@pytest.mark.parametrize("value", [None, "", "unknown", True, [65], {"value": 65}])
+def test_probability_rejects_non_numbers(value):
+    assert _probability(value) is None
+
+ANALYSIS = {
+    "win_probability": 65,
+    "favorable_points": ["Registered rent agreement", "Rent receipts"],
+    "unfavorable_points": ["No reply to the first notice"],
+    "legal_basis": "Rent Control Act",
+}
+
+def test_parses_clean_json_without_repair():
+    result, repaired = parse_analysis_json(json.dumps(ANALYSIS))
+
+    assert result == (0.65, ["Registered rent agreement", "Rent receipts"], ["No reply to the first notice"], "Rent Control Act")
+    assert not repaired
+
+def test_parses_json_wrapped_in_prose_and_code_fences():
+    text = "Here is the analysis:\n```json\n" + json.dumps(ANALYSIS) + "\n```\nHope this helps {not json}."
+
+    result, repaired = parse_analysis_json(text)
+
+    assert result[0] == 0.65
+    assert repaired
+
+def test_tolerates_loosely_typed_fields():
+    text = json.dumps({
+        "WIN_PROBABILITY": "70%",
+        "favorablePoints": "- Registered rent agreement\n- Rent receipts\n",
+        "unfavorable_points": ["  * No reply  ", ""],
+        "legal_basis": {"act": "Rent Control Act"},
+    })
+
+    (win_probability, favorable, unfavorable, legal_basis), repaired = parse_analysis_json(text)
+
+    assert win_probability == 0.7
+    assert favorable == ["Registered rent agreement", "Rent receipts"]
+    assert unfavorable == ["No reply"]
+    assert json.loads(legal_basis) == {"act": "Rent Control Act"}
+    assert repaired
+
+@pytest.mark.parametrize("text", ["", "no analysis here", "[1, 2]", json.dumps({"favorable_points": []})])
+def test_unreadable_analysis_returns_none(text):
+    result, _ = parse_analysis_json(text)
+    assert result is None
+
+def test_parses_section_format():
+    text = """WIN_PROBABILITY: 40%
+
+FAVORABLE_POINTS:
+- Written agreement
+
+UNFAVORABLE_POINTS:
+- Late payment
+
+LEGAL_BASIS:
+Indian Contract Act"""
+
+    assert parse_analysis_sections(text) == (0.4, ["Written agreement"], ["Late payment"], "Indian Contract Act")
+    assert parse_analysis_sections("nothing useful") is None
+
+def test_section_format_keeps_line_breaks_after_the_legal_basis_header():
+    text = "WIN_PROBABILITY: 40%\nLEGAL_BASIS: Section 5 says\nthings.\n\nMore."
+
+    assert parse_analysis_sections(text)[3] == "Section 5 says\nthings.\n\nMore."
+    assert parse_analysis_sections("WIN_PROBABILITY: 40%\nLEGAL_BASIS: Section 5")[3] == "Section 5"
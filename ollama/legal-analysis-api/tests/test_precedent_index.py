@@ -0,0 +1,153 @@
+import asyncio
+import os
+import sqlite3
+
+import pytest
+
+from app.indian_kanoon import IndianKanoonClient
+from app.precedent_index import IndexInUseError, PrecedentIndex, add_directory, is_kanoon_doc_id
+
+JUDGMENTS = {
+    "101": ("Sharma v. Gupta", "The tenant cannot be evicted without notice under the Rent Control Act."),
+    "102": ("State v. Ram", "The accused was charged with theft and the recovery of stolen property."),
+    "103": ("Mehta v. Bank", "The cheque was dishonoured for insufficient funds under Section 138."),
+    "104": ("Kaur v. Singh", "Eviction of a tenant requires an order of the Rent Controller after notice."),
+    "105": ("Rao v. Union", "Termination of employment without an inquiry violates natural justice."),
+}
+
+@pytest.fixture
+def index(tmp_path):
+    index = PrecedentIndex(str(tmp_path / "index"), flush_every=2)
+    yield index
+    index.close()
+
+def add_all(index):
+    for doc_id, (title, text) in JUDGMENTS.items():
+        assert index._add(doc_id, title, text, None)
+    index.flush_now()
+
+def search_ids(index, query):
+    return [result["doc_id"] for result in index._search(query, 5)]
+
+def test_search_ranks_matching_judgments(index):
+    add_all(index)
+
+    results = index._search("eviction of tenant without notice", 5)
+
+    assert [result["doc_id"] for result in results][:2] == ["104", "101"]
+    assert all(0 < result["score"] <= 1 and result["source"] == "local" for result in results)
+    assert search_ids(index, "dishonoured cheque") == ["103"]
+    assert index._search("habeas corpus", 5) == []
+
+def test_documents_are_written_in_segments_and_deduplicated(index):
+    add_all(index)
+
+    assert index.doc_count == 5
+    assert len(index._segments) == 3
+    assert not index._add("101", "Sharma v. Gupta", "again", None)
+
+def test_compact_merges_segments_without_changing_results(index):
+    add_all(index)
+    before = {query: index._search(query, 5) for query in ("tenant notice", "theft", "employment inquiry")}
+
+    index.compact()
+
+    assert len(index._segments) == 1
+    assert len([name for name in os.listdir(index.path) if name.endswith(".postings")]) == 1
+    assert {query: index._search(query, 5) for query in before} == before
+
+def test_index_is_reopened_from_disk(tmp_path):
+    path = str(tmp_path / "index")
+    index = PrecedentIndex(path, flush_every=2)
+    add_all(index)
+    expected = index._search("tenant notice", 5)
+    index.close()
+
+    reopened = PrecedentIndex(path)
+    try:
+        assert reopened._search("tenant notice", 5) == expected
+        assert reopened.doc_count == 5
+    finally:
+        reopened.close()
+
+class FailingConnection:
+    """Delegates to a real connection but fails inserting into `terms`, like a full disk would"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def executemany(self, sql, rows):
+        if "INTO terms" in sql:
+            raise sqlite3.OperationalError("database or disk is full")
+        return self.conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+def test_failed_flush_leaves_the_index_unchanged_and_keeps_pending_documents(index):
+    add_all(index)
+    conn = index._conn
+    index._conn = FailingConnection(conn)
+    index._add("201", "Das v. Roy", "Partition of ancestral property between the brothers.", None)
+
+    with pytest.raises(sqlite3.OperationalError):
+        index.flush_now()
+
+    assert index.doc_count == 5
+    assert os.path.getsize(os.path.join(index.path, "lengths.bin")) == 5 * 4
+    assert conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 5
+    assert len([name for name in os.listdir(index.path) if name.endswith(".postings")]) == 3
+    assert [doc_id for doc_id, *_ in index._pending] == ["201"]
+
+    index._conn = conn
+    index.flush_now()
+    assert index.doc_count == 6
+    assert search_ids(index, "ancestral partition") == ["201"]
+    # Lengths stayed aligned with document numbers
+    assert search_ids(index, "eviction of tenant without notice")[:2] == ["104", "101"]
+
+def test_index_cannot_be_opened_twice(index):
+    index.open()
+
+    other = PrecedentIndex(index.path)
+    with pytest.raises(IndexInUseError):
+        other.open()
+
+def test_directory_documents_are_not_kanoon_ids(index, tmp_path):
+    directory = tmp_path / "judgments"
+    directory.mkdir()
+    (directory / "12345.txt").write_text("Sharma v. Gupta\nThe tenant cannot be evicted without notice.")
+
+    assert add_directory(index, str(directory)) == 1
+
+    (result,) = index._search("tenant evicted", 5)
+    assert result["doc_id"] == "file:12345"
+    assert not is_kanoon_doc_id(result["doc_id"])
+    assert is_kanoon_doc_id("12345")
+
+def test_unseen_query_terms_lower_the_normalized_score(index):
+    add_all(index)
+
+    (full,) = [r for r in index._search("tenant", 5) if r["doc_id"] == "101"]
+    (partial,) = [
+        r for r in index._search("dowry harassment cruelty husband wife tenant section 498a ipc", 5)
+        if r["doc_id"] == "101"
+    ]
+    assert partial["bm25"] == full["bm25"]
+    assert partial["score"] < full["score"] / 5
+
+def test_query_sharing_one_term_with_the_index_falls_back_to_kanoon(index):
+    add_all(index)
+    client = IndianKanoonClient(api_key="test", precedent_index=index, local_min_score=0.4)
+    remote = [{"doc_id": "9001", "title": "Devi v. State"}]
+    searched = []
+
+    async def fetch_search(query, max_results):
+        searched.append(query)
+        return remote
+
+    client._fetch_search = fetch_search
+    query = "dowry harassment cruelty husband wife tenant 498a ipc"
+    assert asyncio.run(client.search_cases(query)) == remote
+    assert searched == [query]
+    assert asyncio.run(client.search_cases("tenant notice rent control"))[0]["source"] == "local"
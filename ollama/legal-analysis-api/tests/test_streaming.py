@@ -0,0 +1,55 @@
+import pytest
+
+from app.streaming import AnalysisStreamParser
+
+ANSWER = """WIN_PROBABILITY: 65%
+
+FAVORABLE_POINTS:
+- Registered rent agreement
+* Rent receipts
+
+UNFAVORABLE_POINTS:
+- No reply to the first notice
+- ...
+
+LEGAL_BASIS: Section 106 of the Transfer of Property Act requires
+notice before eviction.
+
+Self-help eviction is unlawful."""
+
+def parse(chunks):
+    parser = AnalysisStreamParser()
+    events = [event for chunk in chunks for event in parser.feed(chunk)]
+    events += parser.close()
+    return parser, events
+
+@pytest.mark.parametrize("size", [1, 3, 7, len(ANSWER)])
+def test_streamed_answer_parses_the_same_at_any_chunk_size(size):
+    parser, events = parse(ANSWER[i:i + size] for i in range(0, len(ANSWER), size))
+
+    assert parser.result() == (
+        0.65,
+        ["Registered rent agreement", "Rent receipts"],
+        ["No reply to the first notice"],
+        "Section 106 of the Transfer of Property Act requires\nnotice before eviction.\n\nSelf-help eviction is unlawful.",
+    )
+    assert "".join(data["delta"] for event, data in events if event == "legal_basis") == parser.legal_basis
+
+def test_events_arrive_in_order_as_each_piece_completes():
+    _, events = parse([ANSWER])
+
+    assert [event for event, _ in events][:4] == ["probability", "favorable_point", "favorable_point", "unfavorable_point"]
+    assert events[0][1] == {"win_probability": 0.65}
+    assert events[2][1] == {"index": 1, "text": "Rent receipts"}
+
+def test_legal_basis_on_its_own_lines():
+    parser, _ = parse(["WIN_PROBABILITY: 30\nLEGAL_BASIS:\n", "  Indian Contract Act\nsection 73"])
+
+    assert parser.result()[0] == 0.3
+    assert parser.result()[3] == "Indian Contract Act\nsection 73"
+
+def test_answer_without_probability_falls_back():
+    parser, events = parse(["I cannot assess this case."])
+
+    assert events == []
+    assert parser.result() == (0.5, ["Could not determine"], ["Could not determine"], "Analysis incomplete due to formatting issues")